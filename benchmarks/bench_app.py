@@ -0,0 +1,105 @@
+# Mede a latência de reexecução do aplicativo (corpus_app.py) com muitos textos colados na aba
+# de geração, usando o AppTest do Streamlit: para cada interação, o melhor tempo entre as
+# repetições de uma execução do script. O AppTest sempre executa o script inteiro; interações
+# dentro de fragmentos, que no navegador só executam o fragmento, custam menos que o medido aqui.
+# Uso: python -m benchmarks.bench_app [--linhas 50000] [--repeticoes 3] [--saida resultados.json]
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.sintetico import GeradorCorpus
+
+VERSAO_FORMATO = 1
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "corpus_app.py")
+TEMPO_LIMITE = 600
+
+
+def widget(elementos, **atributos):
+    for elemento in elementos:
+        if all(getattr(elemento, nome) == valor for nome, valor in atributos.items()):
+            return elemento
+    raise LookupError(atributos)
+
+
+def area_de_texto(at, inicio_rotulo):
+    return next(area for area in at.text_area if area.label.startswith(inicio_rotulo))
+
+
+def preparar(num_linhas, semente):
+    # Um dicionário de entidades salvo fica selecionado: as entidades digitadas são juntadas a ele.
+    # Importado só aqui, depois de main() definir IRANOTEXT_DICIONARIOS, lido na importação.
+    from iranotext.dicionarios import preparar_entidades
+    from iranotext.repositorio import RepositorioDicionarios
+
+    RepositorioDicionarios().salvar("entidades", "bench", preparar_entidades("Banco Central"))
+    at = AppTest.from_file(APP, default_timeout=TEMPO_LIMITE).run()
+    widget(at.selectbox, key="dic_nome_entidades").select("bench").run()
+    textos = GeradorCorpus(semente).textos(num_linhas)
+    area_de_texto(at, "Cole aqui os textos").input("\n".join(t["texto"] for t in textos)).run()
+    widget(at.number_input, key="meta_global_n").set_value(1).run()
+    widget(at.text_input, key="meta_campo_0").input("Fonte").run()
+    return at
+
+
+def interacoes():
+    # Cada interação alterna entre dois valores, para que toda repetição seja uma mudança real.
+    return {
+        "reexecucao": lambda at, i: at.run(),
+        "pagina_metadados": lambda at, i: widget(at.number_input, key="meta_pagina").set_value(2 + i % 2).run(),
+        "texto_entidades": lambda at, i: area_de_texto(at, "Cole aqui ou digite as entidades").input(f"Universidade de São Paulo {i % 2}").run(),
+        "filtro_desempenho": lambda at, i: widget(at.checkbox, label="📈 Painel de desempenho").set_value(i % 2 == 0).run(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--linhas", type=int, default=50000)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", help="arquivo JSON para os resultados (padrão: saída padrão)")
+    args = parser.parse_args(argv)
+
+    # Dicionários e tarefas do aplicativo ficam em pastas temporárias, sem tocar nas do usuário.
+    pasta = tempfile.mkdtemp(prefix="iranotext_bench_app_")
+    os.environ["IRANOTEXT_DICIONARIOS"] = os.path.join(pasta, "dicionarios")
+    os.environ["IRANOTEXT_TAREFAS"] = os.path.join(pasta, "tarefas")
+
+    at = preparar(args.linhas, args.semente)
+    resultados = []
+    for nome, interagir in interacoes().items():
+        melhor = None
+        for i in range(args.repeticoes):
+            inicio = time.perf_counter()
+            interagir(at, i)
+            decorrido = time.perf_counter() - inicio
+            melhor = decorrido if melhor is None else min(melhor, decorrido)
+        if at.exception:
+            raise RuntimeError(f"{nome}: {at.exception[0].value}")
+        resultados.append({"interacao": nome, "linhas": args.linhas, "segundos": round(melhor, 4)})
+
+    dados = {
+        "formato": VERSAO_FORMATO,
+        "data": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "repeticoes": args.repeticoes,
+        "resultados": resultados,
+    }
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(dados, arquivo, ensure_ascii=False, indent=1)
+    else:
+        json.dump(dados, sys.stdout, ensure_ascii=False, indent=1)
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
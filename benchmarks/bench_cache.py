@@ -0,0 +1,51 @@
+# Mede a regeneração do corpus com cache: geração completa, repetição sem mudanças e
+# repetição após incluir uma entidade no dicionário. Confere que as saídas são idênticas
+# às geradas sem cache.
+# Uso: python -m benchmarks.bench_cache [--textos N] [--entidade "termo"]
+import argparse
+import hashlib
+import sys
+import time
+
+from benchmarks.bench_paralelo import executar as executar_sem_cache
+from benchmarks.bench_paralelo import montar_textos
+from iranotext.cache import CacheCorpus
+from iranotext.corpus import TAMANHO_BLOCO, EstatisticasCorpus, gerar_corpus
+from iranotext.dicionarios import preparar_entidades, preparar_sigla
+
+
+def executar(textos, entidades, siglas, cache):
+    estatisticas = EstatisticasCorpus()
+    resumo = hashlib.sha256()
+    inicio = time.perf_counter()
+    for registro in gerar_corpus(textos, entidades, siglas, estatisticas=estatisticas, cache=cache):
+        resumo.update(registro.encode("utf-8"))
+    return time.perf_counter() - inicio, resumo.hexdigest(), estatisticas.formatar()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--textos", type=int, default=50000)
+    parser.add_argument("--entidade", default="Banco Central")
+    args = parser.parse_args(argv)
+
+    # Cada texto recebe um número para que nenhum se repita no cache.
+    textos = [{"id": t["id"], "texto": f"{t['texto']} Protocolo {i}."} for i, t in enumerate(montar_textos(args.textos))]
+    entidades = preparar_entidades("São Paulo\nRio de Janeiro")
+    siglas = [preparar_sigla("USP", "Universidade de São Paulo"), preparar_sigla("IBGE", "Instituto Brasileiro de Geografia e Estatística")]
+    entidades_editadas = entidades + preparar_entidades(args.entidade)
+
+    cache = CacheCorpus()
+    print(f"{args.textos} textos")
+    for nome, ents in (("completa", entidades), ("sem mudanças", entidades), ("entidade incluída", entidades_editadas)):
+        tempo, resumo, estatisticas = executar(textos, ents, siglas, cache)
+        _, resumo_esperado, estatisticas_esperadas = executar_sem_cache(textos, ents, siglas, 1, TAMANHO_BLOCO)
+        if (resumo, estatisticas) != (resumo_esperado, estatisticas_esperadas):
+            print(f"{nome}: saída diferente da geração sem cache")
+            return 1
+        print(f"{nome:18} {tempo:6.2f} s  {cache.formatar()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
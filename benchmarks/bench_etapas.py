@@ -0,0 +1,172 @@
+# Mede cada etapa da geração do corpus sobre textos sintéticos, variando o número de textos
+# e o tamanho dos dicionários, e grava os resultados em JSON. Com --base, compara com um
+# resultado anterior: tempos acima do limite de regressão ou saídas diferentes (o hash do
+# corpus gerado) fazem o comando terminar com erro.
+# Uso: python -m benchmarks.bench_etapas [--textos 1000 10000] [--dicionarios 10 1000]
+#      [--saida resultados.json] [--base benchmarks/dados/base_etapas.json] [--limite 0.25]
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import platform
+import re
+import sys
+import time
+
+from benchmarks.sintetico import GeradorCorpus
+from iranotext.corpus import EstatisticasCorpus, gerar_corpus
+from iranotext.dicionarios import SubstituidorDicionario, compilar_padrao, dicionario_entidades, dicionario_siglas
+from iranotext.indice import indexar_siglas
+from iranotext.normalizacao import converter_numeros_por_extenso, normalizar_texto, processar_palavras_com_se, processar_pronomes_pospostos
+from iranotext.sanitizacao import sanitizar_texto
+
+VERSAO_FORMATO = 1
+# Etapas cujo tempo não depende do número de textos.
+ETAPAS_SEM_TEXTOS = {"compilacao_dicionarios"}
+# Abaixo disso a variação de medida supera qualquer diferença real.
+TEMPO_MINIMO_COMPARACAO = 0.001
+BASE_PADRAO = os.path.join(os.path.dirname(__file__), "dados", "base_etapas.json")
+
+
+def cronometrar(funcao, repeticoes):
+    # Melhor tempo entre as repetições, e o valor devolvido pela última.
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        valor = funcao()
+        decorrido = time.perf_counter() - inicio
+        melhor = decorrido if melhor is None else min(melhor, decorrido)
+    return melhor, valor
+
+
+def medir_etapas(textos, entidades, siglas, repeticoes):
+    # Cada etapa recebe a saída da anterior, como na geração do corpus.
+    brutos = [t["texto"].lower() for t in textos]
+    tempos = {}
+
+    tempos["numeros_por_extenso"], com_numeros = cronometrar(lambda: [converter_numeros_por_extenso(t) for t in brutos], repeticoes)
+    tempos["pronomes"], _ = cronometrar(lambda: [processar_pronomes_pospostos(processar_palavras_com_se(t)) for t in com_numeros], repeticoes)
+    tempos["normalizacao"], normalizados = cronometrar(lambda: [normalizar_texto(t) for t in brutos], repeticoes)
+
+    # Sem os padrões já compilados de repetições anteriores (no nosso cache e no do módulo re),
+    # para medir a compilação de fato.
+    tempos["compilacao_dicionarios"], (substituidor_siglas, substituidor_entidades) = cronometrar(
+        lambda: (compilar_padrao.cache_clear(), re.purge(),
+                 SubstituidorDicionario(dicionario_siglas(siglas), remover_parenteses=True),
+                 SubstituidorDicionario(dicionario_entidades(entidades)))[2:],
+        repeticoes)
+    tempos["siglas"], com_siglas = cronometrar(lambda: [substituidor_siglas.substituir(t)[0] for t in normalizados], repeticoes)
+    tempos["entidades"], com_entidades = cronometrar(lambda: [substituidor_entidades.substituir(t)[0] for t in com_siglas], repeticoes)
+    tempos["sanitizacao"], _ = cronometrar(lambda: [sanitizar_texto(t) for t in com_entidades], repeticoes)
+
+    def montar():
+        resumo = hashlib.sha256()
+        for registro in gerar_corpus(textos, entidades, siglas, estatisticas=EstatisticasCorpus()):
+            resumo.update(registro.encode("utf-8"))
+        return resumo.hexdigest()
+
+    tempos["corpus_completo"], resumo = cronometrar(montar, repeticoes)
+    texto_unico = "\n".join(t["texto"] for t in textos)
+    tempos["indice_siglas"], _ = cronometrar(lambda: indexar_siglas(texto_unico), repeticoes)
+    return tempos, resumo
+
+
+def executar(num_textos, tamanhos_dicionario, semente, repeticoes):
+    resultados = []
+    for tamanho in tamanhos_dicionario:
+        gerador = GeradorCorpus(semente, num_siglas=tamanho, num_entidades=tamanho)
+        textos = gerador.textos(num_textos)
+        tempos, resumo = medir_etapas(textos, gerador.entidades(), gerador.siglas, repeticoes)
+        for etapa, segundos in tempos.items():
+            resultados.append({
+                "etapa": etapa,
+                "textos": num_textos,
+                "dicionario": tamanho,
+                "segundos": round(segundos, 6),
+                "textos_por_segundo": round(num_textos / segundos, 1) if segundos and etapa not in ETAPAS_SEM_TEXTOS else None,
+            })
+        resultados.append({"etapa": "saida_sha256", "textos": num_textos, "dicionario": tamanho, "sha256": resumo})
+    return resultados
+
+
+def chave(resultado):
+    return resultado["etapa"], resultado["textos"], resultado["dicionario"]
+
+
+def comparar(resultados, base, limite):
+    # Devolve as linhas do relatório de comparação e se houve regressão ou saída diferente.
+    anteriores = {chave(r): r for r in base["resultados"]}
+    linhas = []
+    falhou = False
+    for resultado in resultados:
+        anterior = anteriores.get(chave(resultado))
+        if anterior is None:
+            continue
+        etapa, textos, dicionario = chave(resultado)
+        rotulo = f"{etapa} ({textos} textos, dicionário {dicionario})"
+        if etapa == "saida_sha256":
+            if resultado["sha256"] != anterior["sha256"]:
+                linhas.append(f"SAÍDA DIFERENTE   {rotulo}")
+                falhou = True
+            continue
+        razao = resultado["segundos"] / anterior["segundos"] if anterior["segundos"] else 1.0
+        if anterior["segundos"] < TEMPO_MINIMO_COMPARACAO:
+            situacao = "ok"
+        elif razao > 1 + limite:
+            situacao = "REGRESSÃO"
+            falhou = True
+        elif razao < 1 - limite:
+            situacao = "melhora"
+        else:
+            situacao = "ok"
+        linhas.append(f"{situacao:17} {rotulo}: {anterior['segundos']:.4f} s -> {resultado['segundos']:.4f} s ({razao:.2f}x)")
+    return linhas, falhou
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--textos", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--dicionarios", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", help="arquivo JSON para os resultados (padrão: saída padrão)")
+    parser.add_argument("--base", help=f"resultados anteriores para comparação (ex.: {os.path.relpath(BASE_PADRAO)})")
+    parser.add_argument("--limite", type=float, default=0.25, help="aumento de tempo tolerado antes de acusar regressão (padrão: 0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    resultados = []
+    for num_textos in args.textos:
+        resultados.extend(executar(num_textos, args.dicionarios, args.semente, args.repeticoes))
+    dados = {
+        "formato": VERSAO_FORMATO,
+        "data": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "semente": args.semente,
+        "repeticoes": args.repeticoes,
+        "resultados": resultados,
+    }
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(dados, arquivo, ensure_ascii=False, indent=1)
+    else:
+        json.dump(dados, sys.stdout, ensure_ascii=False, indent=1)
+        print()
+
+    if args.base:
+        with open(args.base, encoding="utf-8") as arquivo:
+            base = json.load(arquivo)
+        if base.get("semente") != args.semente:
+            print("Aviso: a base foi gerada com outra semente; as saídas não são comparáveis.", file=sys.stderr)
+        linhas, falhou = comparar(resultados, base, args.limite)
+        for linha in linhas:
+            print(linha, file=sys.stderr)
+        return 1 if falhou else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
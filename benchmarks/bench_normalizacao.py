@@ -0,0 +1,54 @@
+# Confere a normalização contra o corpus de referência e mede o custo por texto.
+# Uso: python -m benchmarks.bench_normalizacao [--repeticoes N]
+import argparse
+import os
+import sys
+import time
+
+from iranotext.normalizacao import (
+    converter_numeros_por_extenso,
+    normalizar_texto,
+    processar_palavras_com_se,
+    processar_pronomes_pospostos,
+)
+
+DIR_DADOS = os.path.join(os.path.dirname(__file__), "dados")
+
+
+def ler_linhas(nome):
+    with open(os.path.join(DIR_DADOS, nome), encoding="utf-8") as arquivo:
+        return arquivo.read().splitlines()
+
+
+def por_etapas(texto):
+    return processar_pronomes_pospostos(processar_palavras_com_se(converter_numeros_por_extenso(texto)))
+
+
+def medir(funcao, textos, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for texto in textos:
+            funcao(texto)
+    return (time.perf_counter() - inicio) / (repeticoes * len(textos)) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    entrada = ler_linhas("normalizacao_entrada.txt")
+    esperado = ler_linhas("normalizacao_esperado.txt")
+    divergentes = [i + 1 for i, (texto, saida) in enumerate(zip(entrada, esperado)) if normalizar_texto(texto) != saida]
+    if divergentes:
+        print(f"Saída divergente do corpus de referência nas linhas: {divergentes[:20]}")
+        return 1
+
+    print(f"Corpus de referência: {len(entrada)} textos idênticos")
+    print(f"Por etapas: {medir(por_etapas, entrada, args.repeticoes):.1f} µs/texto")
+    print(f"Fundido:    {medir(normalizar_texto, entrada, args.repeticoes):.1f} µs/texto")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+# Mede a geração do corpus em série e em paralelo e confere que as saídas são idênticas.
+# Uso: python -m benchmarks.bench_paralelo [--textos N] [--processos 1 2 4] [--tamanho-bloco N]
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+from iranotext.corpus import TAMANHO_BLOCO, EstatisticasCorpus, gerar_corpus
+from iranotext.dicionarios import preparar_entidades, preparar_sigla
+
+DIR_DADOS = os.path.join(os.path.dirname(__file__), "dados")
+
+
+def montar_textos(quantidade):
+    with open(os.path.join(DIR_DADOS, "normalizacao_entrada.txt"), encoding="utf-8") as arquivo:
+        linhas = arquivo.read().splitlines()
+    return [{"id": f"texto_{i+1}", "texto": linhas[i % len(linhas)] + " Segundo a USP (USP), São Paulo tem 50% dos casos."} for i in range(quantidade)]
+
+
+def executar(textos, entidades, siglas, processos, tamanho_bloco):
+    estatisticas = EstatisticasCorpus()
+    resumo = hashlib.sha256()
+    inicio = time.perf_counter()
+    for registro in gerar_corpus(textos, entidades, siglas, None, estatisticas, processos, tamanho_bloco):
+        resumo.update(registro.encode("utf-8"))
+    return time.perf_counter() - inicio, resumo.hexdigest(), estatisticas.formatar()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--textos", type=int, default=100000)
+    parser.add_argument("--processos", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--tamanho-bloco", type=int, default=TAMANHO_BLOCO)
+    args = parser.parse_args(argv)
+
+    textos = montar_textos(args.textos)
+    entidades = preparar_entidades("São Paulo\nRio de Janeiro")
+    siglas = [preparar_sigla("USP", "Universidade de São Paulo"), preparar_sigla("IBGE", "Instituto Brasileiro de Geografia e Estatística")]
+
+    tempo_serial, resumo_serial, estatisticas_serial = executar(textos, entidades, siglas, 1, args.tamanho_bloco)
+    print(f"{args.textos} textos, {os.cpu_count()} CPUs")
+    print(f"serial:       {tempo_serial:.2f} s")
+    for processos in args.processos:
+        if processos < 2:
+            continue
+        tempo, resumo, estatisticas = executar(textos, entidades, siglas, processos, args.tamanho_bloco)
+        if (resumo, estatisticas) != (resumo_serial, estatisticas_serial):
+            print(f"{processos} processos: saída diferente do modo serial")
+            return 1
+        print(f"{processos} processos: {tempo:.2f} s (aceleração {tempo_serial / tempo:.2f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
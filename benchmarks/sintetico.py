@@ -0,0 +1,101 @@
+# Gerador determinístico (com semente) de textos sintéticos em português, com números por
+# extenso, pronomes enclíticos e mesoclíticos, siglas, entidades com várias palavras e
+# caracteres especiais em densidades ajustáveis, junto com os dicionários correspondentes.
+import random
+
+from iranotext.dicionarios import preparar_sigla
+from iranotext.normalizacao import NUMEROS_POR_EXTENSO
+from iranotext.sanitizacao import CARACTERES_ESPECIAIS
+
+PALAVRAS = (
+    "a o os as de da do das dos em no na nos nas um uma para com por que não mais como mas "
+    "foi ser está são tem pelo pela sobre entre depois antes quando muito também já ainda só "
+    "ano anos dia tempo casa cidade estado governo pessoas trabalho vida parte grupo forma "
+    "projeto pesquisa dados saúde educação escola professor aluno comunidade relatório sistema "
+    "programa recursos política processo resultado análise questão momento lugar mundo país "
+    "disse afirmou informou explicou apresentou destacou realizou aumentou reduziu manteve "
+    "grande novo nova público pública social nacional importante maior primeiro segunda"
+).split()
+
+ENCLISES = (
+    "vende-se", "fala-se", "sabe-se", "disse-lhe", "disse-lhes", "encontrou-o", "encontrou-a",
+    "levaram-nos", "chamou-me", "contou-te", "viu-os", "deu-as", "pediu-vos", "organizou-se",
+)
+MESOCLISES = ("dá-lo-ia", "fá-la-ia", "comprá-los-ia", "vendê-las-ia", "dir-se-ia", "encontrá-lo-ia")
+
+TIPOS_ENTIDADE = ("Universidade", "Instituto", "Secretaria", "Banco", "Fundação", "Hospital", "Museu", "Conselho")
+CONECTORES = ("de", "do", "da", "dos", "das")
+SILABAS = "ba be bi bo bu ca co cu da de di do fa fe fi fo ga go gu la le li lo lu ma me mi mo mu na ne ni no pa pe pi po ra re ri ro sa se si so ta te ti to va ve vi vo".split()
+NUMEROS = tuple(NUMEROS_POR_EXTENSO)
+ESPECIAIS = tuple(CARACTERES_ESPECIAIS)
+
+
+class GeradorCorpus:
+    def __init__(self, semente=0, num_siglas=100, num_entidades=100, palavras_por_texto=(20, 60),
+                 densidade_numeros=0.04, densidade_pronomes=0.04, densidade_siglas=0.03,
+                 densidade_entidades=0.03, densidade_especiais=0.02):
+        self.aleatorio = random.Random(semente)
+        self.palavras_por_texto = palavras_por_texto
+        self.densidades = (
+            (densidade_numeros, self._numero),
+            (densidade_pronomes, self._pronome),
+            (densidade_siglas, self._sigla),
+            (densidade_entidades, self._entidade),
+            (densidade_especiais, self._especial),
+        )
+        self.nomes_entidades = self._entidades(num_entidades)
+        self.siglas = self._siglas(num_siglas)
+
+    def _nome_proprio(self, minimo=2, maximo=4):
+        return "".join(self.aleatorio.choice(SILABAS) for _ in range(self.aleatorio.randint(minimo, maximo))).capitalize()
+
+    def _entidades(self, quantidade):
+        nomes = set()
+        while len(nomes) < quantidade:
+            nomes.add(f"{self.aleatorio.choice(TIPOS_ENTIDADE)} {self.aleatorio.choice(CONECTORES)} {self._nome_proprio()}")
+        return sorted(nomes)
+
+    def _siglas(self, quantidade):
+        # Cada sigla tem um significado cujas palavras começam pelas suas letras.
+        siglas = {}
+        while len(siglas) < quantidade:
+            sigla = "".join(self.aleatorio.choice("ABCDEFGHIJLMNOPRSTUV") for _ in range(self.aleatorio.randint(2, 5)))
+            if sigla not in siglas:
+                siglas[sigla] = " ".join(letra + self._nome_proprio(1, 3).lower() for letra in sigla)
+        return [preparar_sigla(sigla, significado) for sigla, significado in sorted(siglas.items())]
+
+    def entidades(self):
+        return [{"Entidades nomeadas": nome, "Palavra normalizada": nome.replace(" ", "_")} for nome in self.nomes_entidades]
+
+    def _numero(self):
+        return self.aleatorio.choice(NUMEROS)
+
+    def _pronome(self):
+        return self.aleatorio.choice(MESOCLISES if self.aleatorio.random() < 0.2 else ENCLISES)
+
+    def _sigla(self):
+        sigla = self.aleatorio.choice(self.siglas)["Sigla"]
+        return f"({sigla})" if self.aleatorio.random() < 0.2 else sigla
+
+    def _entidade(self):
+        return self.aleatorio.choice(self.nomes_entidades)
+
+    def _especial(self):
+        return self.aleatorio.choice(ESPECIAIS) + self.aleatorio.choice(PALAVRAS)
+
+    def texto(self):
+        palavras = []
+        for _ in range(self.aleatorio.randint(*self.palavras_por_texto)):
+            sorteio = self.aleatorio.random()
+            for densidade, gerar in self.densidades:
+                if sorteio < densidade:
+                    palavras.append(gerar())
+                    break
+                sorteio -= densidade
+            else:
+                palavras.append(self.aleatorio.choice(PALAVRAS))
+        palavras[0] = palavras[0].capitalize()
+        return " ".join(palavras) + "."
+
+    def textos(self, quantidade):
+        return [{"id": f"texto_{i+1}", "texto": self.texto()} for i in range(quantidade)]
@@ -1,9 +1,38 @@
 import streamlit as st 
 import pandas as pd
-import re
-import io
-import spacy
+import copy
+import os
+import time
+import uuid
 from word2number import w2n
+from iranotext.analise import TAMANHO_LOTE_NER, carregar_modelo_nlp
+from iranotext.cache import CacheCorpus
+from iranotext.corpus import cabecalhos_metadados, preparar_textos
+from iranotext.dicionarios import preparar_entidades, preparar_sigla
+from iranotext.ingestao import COLUNA_ID, ler_entidades, ler_metadados, ler_siglas, ler_textos
+from iranotext.instrumentacao import Instrumentacao, ativar_log_json
+from iranotext.repositorio import COLUNAS_DICIONARIO, DicionarioSalvo, RepositorioDicionarios, exportar_csv
+from iranotext.tarefas import (
+    ARQUIVO_CORPUS,
+    ARQUIVO_PERFIL,
+    ARQUIVO_PREVIA,
+    CANCELADA,
+    CONCLUIDA,
+    ERRO,
+    NA_FILA,
+    ExecutorTarefas,
+    LimiteTarefas,
+    carregar_analise,
+    tarefa_analisar,
+    tarefa_gerar_corpus,
+)
+
+NUM_LINHAS_CONSULTA = 200
+LINHAS_POR_PAGINA_METADADOS = 100
+INTERVALO_ATUALIZACAO = 0.5
+
+if os.environ.get("IRANOTEXT_PRECARREGAR_MODELO", "").lower() in ("1", "true", "sim"):
+    carregar_modelo_nlp()
 
 st.markdown(
     """
@@ -59,16 +88,352 @@ st.sidebar.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-nlp = spacy.load("pt_core_news_sm")
+st.sidebar.markdown("---")
+painel_desempenho = st.sidebar.checkbox("📈 Painel de desempenho", help="Mede cada etapa da análise e da geração (tempo, textos/s e bytes) e registra as medições em JSON no log.")
+medir_memoria = st.sidebar.checkbox("Medir memória por etapa", disabled=not painel_desempenho,
+                                    help="Pico de memória alocada em cada etapa (tracemalloc). Deixa o processamento bem mais lento.")
+gravar_perfil = st.sidebar.checkbox("Gravar perfil (cProfile)", disabled=not painel_desempenho)
+
+
+def processar_se_mudou(nome, fonte, funcao):
+    # Guarda na sessão o resultado de funcao(fonte), recalculado só quando o texto de origem muda
+    # (comparado pelo hash, sem guardar uma cópia do texto).
+    chave = (len(fonte), hash(fonte))
+    guardado = st.session_state.get(f"entrada_{nome}")
+    if guardado is None or guardado[0] != chave:
+        guardado = (chave, funcao(fonte))
+        st.session_state[f"entrada_{nome}"] = guardado
+    return guardado[1]
+
+
+def nova_instrumentacao():
+    if not painel_desempenho:
+        return None
+    ativar_log_json()
+    # A tarefa grava o perfil na sua própria pasta, apagada junto com ela.
+    return Instrumentacao(perfil=ARQUIVO_PERFIL if gravar_perfil else None, memoria=medir_memoria)
+
+
+def mostrar_desempenho(instrumentacao, segundos_exibicao=None):
+    if instrumentacao is None:
+        return
+    linhas = instrumentacao.tabela()
+    if segundos_exibicao is not None:
+        linhas.append({"etapa": "exibicao", "segundos": round(segundos_exibicao, 6)})
+    with st.expander("📈 Desempenho", expanded=True):
+        st.dataframe(pd.DataFrame(linhas), hide_index=True, use_container_width=True)
+        if instrumentacao.perfil and os.path.exists(instrumentacao.perfil):
+            with open(instrumentacao.perfil, "rb") as perfil:
+                st.download_button("💾 Baixar perfil (pstats)", data=perfil, file_name="iranotext.pstats", key=instrumentacao.perfil)
+
+
+@st.cache_resource
+def executor_tarefas():
+    # Um único executor por servidor, compartilhado por todas as sessões.
+    return ExecutorTarefas()
+
+
+def usuario_atual():
+    # Identifica a sessão no servidor para o limite de tarefas por usuário.
+    return st.session_state.setdefault("usuario", uuid.uuid4().hex)
+
+
+def tarefa_da_sessao(tipo):
+    # O id da tarefa (uuid4) na URL é o que dá acesso a ela: ao recarregar a página, a sessão
+    # nova reencontra a tarefa em andamento ou o resultado.
+    id_tarefa = st.query_params.get(f"tarefa_{tipo}")
+    return executor_tarefas().tarefa(id_tarefa) if id_tarefa else None
+
+
+def submeter_tarefa(tipo, trabalho, *args, **kwargs):
+    executor = executor_tarefas()
+    anterior = tarefa_da_sessao(tipo)
+    try:
+        tarefa = executor.submeter(tipo, trabalho, *args, usuario=usuario_atual(), **kwargs)
+    except LimiteTarefas as erro:
+        st.warning(f"Não foi possível iniciar: {erro}.")
+        return None
+    if anterior is not None:
+        executor.remover(anterior.id)
+    st.query_params[f"tarefa_{tipo}"] = tarefa.id
+    return tarefa
+
+
+def formatar_duracao(segundos):
+    minutos, segundos = divmod(int(round(segundos)), 60)
+    return f"{minutos} min {segundos:02d} s" if minutos else f"{segundos} s"
+
+
+def descrever_progresso(tarefa):
+    if tarefa.situacao == NA_FILA:
+        return f"Na fila (posição {executor_tarefas().posicao_na_fila(tarefa)}), aguardando outras tarefas no servidor."
+    feitos = f"{tarefa.processados} de {tarefa.total} textos" if tarefa.total else f"{tarefa.processados} textos"
+    partes = [feitos, f"{formatar_duracao(tarefa.segundos)} decorridos"]
+    if tarefa.segundos_restantes is not None:
+        partes.append(f"cerca de {formatar_duracao(tarefa.segundos_restantes)} restantes")
+    if tarefa.cancelamento_pedido:
+        partes.append("cancelando...")
+    return " · ".join(partes)
+
+
+@st.experimental_fragment(run_every=INTERVALO_ATUALIZACAO)
+def painel_tarefa(tarefa, tipo):
+    # Progresso de uma tarefa ativa. Só este fragmento é executado a cada atualização; quando a
+    # tarefa termina, o script inteiro é executado de novo para exibir o resultado.
+    if not tarefa.ativa:
+        st.rerun()
+    st.progress(min(tarefa.processados / tarefa.total, 1.0) if tarefa.total else 0.0)
+    st.caption(descrever_progresso(tarefa))
+    if st.button("⏹️ Cancelar", key=f"cancelar_{tipo}"):
+        tarefa.cancelar()
+
+
+def mostrar_fim_tarefa(tarefa):
+    if tarefa.situacao == CANCELADA:
+        st.info(f"Tarefa cancelada após {tarefa.processados} textos.")
+    elif tarefa.situacao == ERRO:
+        st.error(f"A tarefa falhou: {tarefa.erro}")
+    elif tarefa.situacao != CONCLUIDA:
+        st.warning("A tarefa foi interrompida antes de terminar (o servidor foi reiniciado). Execute-a novamente.")
+
+
+@st.experimental_fragment
+def mostrar_corpus(tarefa):
+    inicio_exibicao = time.perf_counter()
+    resultado = tarefa.resultado
+    if not resultado["textos"]:
+        st.warning("Nenhum corpus gerado.")
+        return
+    with open(tarefa.caminho(ARQUIVO_PREVIA), encoding="utf-8") as arquivo:
+        previa = arquivo.read()
+    st.success(f"Corpus gerado com sucesso em {formatar_duracao(tarefa.segundos)}!")
+    st.subheader("📄 CORPUS TEXTUAL GERADO")
+    st.text_area("🔍 Revise antes de salvar", previa, height=300)
+    if resultado["textos"] > resultado["previa"]:
+        st.caption(f"Prévia dos primeiros {resultado['previa']} de {resultado['textos']} textos. O arquivo salvo contém o corpus completo.")
+    st.text_area("📊 Estatísticas do processamento", resultado["estatisticas"], height=250)
+    if resultado["cache"]:
+        st.caption(resultado["cache"])
+
+    with open(tarefa.caminho(ARQUIVO_CORPUS), "rb") as corpus:
+        st.download_button("💾 SALVAR CORPUS TEXTUAL", data=corpus, file_name="corpus_IRaMuTeQ.txt", mime="text/plain")
+    mostrar_desempenho(tarefa.extras.get("instrumentacao"), time.perf_counter() - inicio_exibicao)
+
+
+@st.experimental_fragment
+def mostrar_analise():
+    # Filtros, tabelas e consulta sobre a última análise; interagir com eles só executa este fragmento.
+    inicio_exibicao = time.perf_counter()
+    texto_analisado, indice_siglas, indice_entidades = st.session_state["analise"]
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        filtro = st.text_input("Filtrar termos")
+    with col2:
+        min_textos = st.number_input("Mínimo de textos", min_value=1, value=1)
+    with col3:
+        ordenacao = st.selectbox("Ordenar por", ["textos", "ocorrencias", "termo"],
+                                 format_func={"textos": "Textos", "ocorrencias": "Ocorrências", "termo": "Termo"}.get)
+    compostas_ordenadas = indice_entidades.ordenar(ordenacao, filtro, int(min_textos))
+    siglas_ordenadas = indice_siglas.ordenar(ordenacao, filtro, int(min_textos))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("### 🕵️‍♂️ ENTIDADES NOMEADAS")
+        if compostas_ordenadas:
+            st.text_area("Adicione no seu dicionário de entidades nomeadas", "\n".join(compostas_ordenadas), height=300)
+            st.dataframe(
+                pd.DataFrame(indice_entidades.tabela(compostas_ordenadas), columns=["termo", "ocorrencias", "textos"])
+                .rename(columns={"termo": "Entidade", "ocorrencias": "Ocorrências", "textos": "Textos"}),
+                hide_index=True,
+                use_container_width=True
+            )
+        else:
+            st.info("Nenhuma entidade nomeada encontrada.")
 
-def detectar_siglas(texto):
-    tokens = re.findall(r"\b[A-Z]{2,}\b", texto)
-    return sorted(set(tokens))
+    with col2:
+        st.markdown("### 🔠 SIGLAS DETECTADAS")
+        if siglas_ordenadas:
+            st.text_area("Adicione no seu dicionário de siglas", "\n".join(siglas_ordenadas), height=300)
+            st.dataframe(
+                pd.DataFrame(indice_siglas.tabela(siglas_ordenadas))
+                .rename(columns={"termo": "Sigla", "ocorrencias": "Ocorrências", "textos": "Textos", "expansao": "Expansão provável"}),
+                hide_index=True,
+                use_container_width=True
+            )
+        else:
+            st.info("Nenhuma sigla encontrada.")
+
+    termos_consulta = siglas_ordenadas + compostas_ordenadas
+    if termos_consulta:
+        termo = st.selectbox("🔎 Ver os textos em que um termo aparece", termos_consulta)
+        indice = indice_siglas if termo in indice_siglas else indice_entidades
+        linhas_texto = processar_se_mudou("linhas_analise", texto_analisado, lambda texto: texto.split("\n"))
+        num_linhas = indice.linhas(termo)
+        st.caption(f"{len(num_linhas)} textos; exibindo até {NUM_LINHAS_CONSULTA}.")
+        st.dataframe(
+            pd.DataFrame({"Linha": [n + 1 for n in num_linhas[:NUM_LINHAS_CONSULTA]],
+                          "Texto": [linhas_texto[n] for n in num_linhas[:NUM_LINHAS_CONSULTA]]}),
+            hide_index=True,
+            use_container_width=True
+        )
+
+    mostrar_desempenho(st.session_state.get("desempenho_analise"), time.perf_counter() - inicio_exibicao)
+
+
+ROTULOS_DICIONARIO = {
+    "siglas": {"Sigla": "Sigla", "Significado": "Significado"},
+    "entidades": {"Entidades nomeadas": "Entidade", "Palavra normalizada": "Forma normalizada"},
+}
+
+
+@st.experimental_fragment
+def editar_dicionario(tipo, arquivo_importado):
+    # Uma única tabela editável por dicionário, partindo de um dicionário salvo e/ou de um arquivo
+    # importado. Devolve o DicionarioSalvo carregado, se a tabela não foi alterada (já vem com as
+    # chaves normalizadas e o padrão montado), ou a lista de entradas editadas.
+    repositorio = RepositorioDicionarios()
+    colunas = COLUNAS_DICIONARIO[tipo]
+    rotulos = ROTULOS_DICIONARIO[tipo]
+
+    col1, col2 = st.columns(2)
+    with col1:
+        nome = st.selectbox("Dicionário salvo", [""] + repositorio.nomes(tipo), key=f"dic_nome_{tipo}",
+                            format_func=lambda n: n or "(nenhum)")
+    with col2:
+        versoes = repositorio.versoes(tipo, nome) if nome else []
+        versao = st.selectbox("Versão", versoes[::-1], key=f"dic_versao_{tipo}", disabled=not versoes)
+
+    assinatura = (nome, versao, arquivo_importado.file_id if arquivo_importado is not None else None)
+    estado = st.session_state.get(f"dic_base_{tipo}")
+    if estado is None or estado["assinatura"] != assinatura:
+        try:
+            salvo = repositorio.carregar(tipo, nome, versao) if nome and versao else None
+        except ValueError as erro:
+            st.warning(f"Não foi possível abrir o dicionário salvo: {erro}")
+            salvo = None
+        registros = list(salvo.registros) if salvo is not None else []
+        aviso = None
+        if arquivo_importado is not None:
+            try:
+                registros += ler_siglas(arquivo_importado) if tipo == "siglas" else ler_entidades(arquivo_importado)
+            except UnicodeDecodeError:
+                aviso = f"{arquivo_importado.name}: o arquivo precisa estar em UTF-8 (no Excel, salve como \"CSV UTF-8\")."
+            except ValueError as erro:
+                aviso = str(erro)
+        estado = {
+            "assinatura": assinatura,
+            "aviso": aviso,
+            "salvo": salvo if salvo is not None and arquivo_importado is None else None,
+            "tabela": pd.DataFrame(registros, columns=colunas).rename(columns=rotulos),
+            "edicao": (estado or {}).get("edicao", 0) + 1,
+        }
+        st.session_state[f"dic_base_{tipo}"] = estado
+
+    if estado["aviso"]:
+        st.warning(estado["aviso"])
+    chave_editor = f"dic_editor_{tipo}_{estado['edicao']}"
+    tabela = st.data_editor(estado["tabela"], num_rows="dynamic", hide_index=True, use_container_width=True, key=chave_editor)
+    # As entradas, o CSV exportado e a comparação com o dicionário salvo só são refeitos quando a tabela muda.
+    edicoes = st.session_state.get(chave_editor)
+    if "registros" not in estado or estado["edicoes"] != edicoes:
+        registros = []
+        for chave, valor in zip(tabela[rotulos[colunas[0]]], tabela[rotulos[colunas[1]]]):
+            chave = chave.strip() if isinstance(chave, str) else ""
+            valor = valor.strip() if isinstance(valor, str) else ""
+            if tipo == "siglas" and chave and valor:
+                registros.append(preparar_sigla(chave, valor))
+            elif tipo == "entidades" and chave:
+                registros.append({"Entidades nomeadas": chave, "Palavra normalizada": valor or chave.replace(" ", "_")})
+        estado["edicoes"] = copy.deepcopy(edicoes)
+        estado["registros"] = registros
+        estado["csv"] = exportar_csv(tipo, registros)
+        estado["inalterado"] = estado["salvo"] is not None and registros == estado["salvo"].registros
+    registros = estado["registros"]
+    st.caption(f"{len(registros)} entradas")
+
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        nome_salvar = st.text_input("Salvar como", value=nome, key=f"dic_salvar_nome_{tipo}", label_visibility="collapsed", placeholder="Nome do dicionário")
+    with col2:
+        if st.button("💾 Salvar dicionário", key=f"dic_salvar_{tipo}", disabled=not registros or not nome_salvar.strip()):
+            salvo = repositorio.salvar(tipo, nome_salvar, registros)
+            st.success(f"Salvo: {salvo.nome}, versão {salvo.versao}.")
+    with col3:
+        st.download_button("⬇️ Exportar CSV", estado["csv"],
+                           file_name=f"{tipo}.csv", mime="text/csv", key=f"dic_exportar_{tipo}", disabled=not registros)
+
+    return estado["salvo"] if estado["inalterado"] else registros
+
+
+def aplicar_edicoes_metadados(chave, inicio):
+    # Passa as células alteradas na página para a tabela completa. O contador de edição muda a
+    # chave do editor, que é recriado já com os novos valores.
+    estado = st.session_state["meta_base"]
+    tabela = estado["tabela"]
+    for linha, valores in st.session_state[chave]["edited_rows"].items():
+        for campo, valor in valores.items():
+            tabela.iat[inicio + int(linha), tabela.columns.get_loc(campo)] = "" if valor is None else str(valor)
+    estado["edicao"] += 1
+
+
+@st.experimental_fragment
+def editar_metadados(ids, campos, arquivo_importado):
+    # A tabela de variáveis (uma linha por texto) fica na sessão e é editada página a página, sem
+    # nunca exibir a tabela inteira. Um arquivo importado é juntado aos textos pelo ID. Com os
+    # textos vindos de arquivo (`ids` None), só o arquivo importado define as variáveis.
+    assinatura = (hash(tuple(ids)) if ids is not None else None, tuple(campos),
+                  arquivo_importado.file_id if arquivo_importado is not None else None)
+    estado = st.session_state.get("meta_base")
+    if estado is None or estado["assinatura"] != assinatura:
+        tabela, aviso = None, None
+        if arquivo_importado is not None:
+            try:
+                importada = ler_metadados(arquivo_importado).drop_duplicates(COLUNA_ID, keep="last")
+            except ValueError as erro:
+                importada, aviso = None, str(erro)
+            if importada is not None and ids is not None:
+                tabela = pd.DataFrame({COLUNA_ID: ids}).merge(importada, how="left", on=COLUNA_ID).fillna("")
+                sem_texto = len(importada) - importada[COLUNA_ID].isin(ids).sum()
+                if sem_texto:
+                    aviso = f"{sem_texto} IDs do arquivo de variáveis não correspondem a nenhum texto."
+            else:
+                tabela = importada
+        elif ids is not None and campos:
+            tabela = pd.DataFrame({COLUNA_ID: ids})
+        if tabela is not None:
+            for campo in campos:
+                if campo not in tabela.columns:
+                    tabela[campo] = ""
+        estado = {"assinatura": assinatura, "tabela": tabela, "aviso": aviso, "edicao": (estado or {}).get("edicao", 0) + 1}
+        st.session_state["meta_base"] = estado
+
+    if estado["aviso"]:
+        st.warning(estado["aviso"])
+    tabela = estado["tabela"]
+    if tabela is None or len(tabela.columns) < 2 or tabela.empty:
+        return None
+
+    st.markdown("**2. Preencher as opções das variáveis para cada texto**")
+    num_paginas = -(-len(tabela) // LINHAS_POR_PAGINA_METADADOS)
+    if st.session_state.get("meta_pagina", 1) > num_paginas:
+        st.session_state["meta_pagina"] = num_paginas
+    pagina = st.number_input("Página", min_value=1, max_value=num_paginas, value=1, key="meta_pagina")
+    inicio = (int(pagina) - 1) * LINHAS_POR_PAGINA_METADADOS
+    fim = min(inicio + LINHAS_POR_PAGINA_METADADOS, len(tabela))
+    chave = f"meta_editor_{estado['edicao']}_{inicio}"
+    st.data_editor(
+        tabela.iloc[inicio:fim],
+        column_config={COLUNA_ID: st.column_config.Column(disabled=True)},
+        hide_index=True,
+        use_container_width=True,
+        key=chave,
+        on_change=aplicar_edicoes_metadados,
+        args=(chave, inicio),
+    )
+    st.caption(f"Textos {inicio + 1}–{fim} de {len(tabela)} ({num_paginas} páginas), {len(tabela.columns) - 1} variáveis")
+    return tabela
 
-def detectar_palavras_compostas(texto):
-    doc = nlp(texto)
-    compostas = [ent.text for ent in doc.ents if len(ent.text.split()) > 1]
-    return list(set(compostas))
 
 st.markdown(
     """
@@ -86,67 +451,77 @@ tabs = st.tabs([
 
 with tabs[0]:
     st.header("")
-    texto_input = st.text_area("", height=350)
-
-    if st.button("🔍 ANALISAR TEXTOS"):
-        if texto_input.strip():
-            siglas = detectar_siglas(texto_input)
-            compostas = detectar_palavras_compostas(texto_input)
+    # Em um formulário: editar o texto ou as configurações não executa o script de novo.
+    with st.form("form_analise", border=False):
+        texto_input = st.text_area("", height=350)
 
+        with st.expander("⚙️ Configurações da análise"):
             col1, col2 = st.columns(2)
             with col1:
-                st.markdown("### 🕵️‍♂️ ENTIDADES NOMEADAS")
-                if compostas:
-                    st.text_area("Adicione no seu dicionário de entidades nomeadas", "\n".join(sorted(compostas)), height=300)
-                else:
-                    st.info("Nenhuma entidade nomeada encontrada.")
-
+                tamanho_lote = st.number_input("Textos por lote", min_value=1, max_value=1000, value=TAMANHO_LOTE_NER)
             with col2:
-                st.markdown("### 🔠 SIGLAS DETECTADAS")
-                if siglas:
-                    st.text_area("Adicione no seu dicionário de siglas", "\n".join(sorted(siglas)), height=300)
-                else:
-                    st.info("Nenhuma sigla encontrada.")
+                processos = st.number_input("Processos paralelos", min_value=1, max_value=os.cpu_count() or 1, value=1)
+
+        analisar = st.form_submit_button("🔍 ANALISAR TEXTOS")
+
+    if analisar:
+        if texto_input.strip():
+            submeter_tarefa("analise", tarefa_analisar, texto_input, int(tamanho_lote),
+                            executor_tarefas().processos_por_tarefa(int(processos)), nova_instrumentacao(),
+                            total=texto_input.count("\n") + 1)
         else:
+            st.session_state.pop("analise", None)
             st.warning("Por favor, insira um texto antes de analisar.")
 
+    tarefa_analise = tarefa_da_sessao("analise")
+    if tarefa_analise is not None:
+        if tarefa_analise.ativa:
+            st.caption("Detectando siglas e entidades nomeadas...")
+            painel_tarefa(tarefa_analise, "analise")
+        elif tarefa_analise.situacao == CONCLUIDA:
+            # Carregada do disco uma vez; filtros e consultas não exigem uma nova análise.
+            if st.session_state.get("analise_tarefa") != tarefa_analise.id:
+                try:
+                    st.session_state["analise"] = carregar_analise(tarefa_analise)
+                except ValueError as erro:
+                    st.error(f"Não foi possível ler o resultado da análise: {erro}")
+                    st.session_state.pop("analise", None)
+                st.session_state["analise_tarefa"] = tarefa_analise.id
+                st.session_state["desempenho_analise"] = tarefa_analise.extras.get("instrumentacao")
+        else:
+            mostrar_fim_tarefa(tarefa_analise)
+
+    if "analise" in st.session_state:
+        mostrar_analise()
+
 with tabs[1]:
     st.header("")
 
     st.subheader("📥 INSERIR TEXTOS PARA PROCESSAMENTO")
 
-    textos = []
     input_textos_brutos = st.text_area("Cole aqui os textos (um por linha):", height=200)
-    if input_textos_brutos.strip():
-        linhas = input_textos_brutos.strip().split("\n")
-        for i, linha in enumerate(linhas):
-            textos.append({"id": f"texto_{i+1}", "texto": linha})
+    arquivo_textos = st.file_uploader("Ou envie um arquivo de textos (TXT com um texto por linha, CSV ou JSONL com a coluna \"texto\"; também .gz)", type=["txt", "csv", "jsonl", "gz"])
+    if arquivo_textos is not None:
+        # Lido em fluxo durante a geração, sem montar a lista de textos.
+        textos = ler_textos(arquivo_textos)
+        tem_textos = True
+    else:
+        textos = processar_se_mudou("textos", input_textos_brutos, preparar_textos)
+        tem_textos = bool(textos)
 
     st.subheader("📚 DICIONÁRIO DE ENTIDADES NOMEADAS")
     entidades_brutas = st.text_area("Cole aqui ou digite as entidades nomeadas (uma por linha):", height=200)
-    entidades = []
+    arquivo_entidades = st.file_uploader("Ou importe um arquivo de entidades (TXT, uma por linha, ou CSV: entidade, forma normalizada)", type=["txt", "csv", "gz"])
+    entidades = editar_dicionario("entidades", arquivo_entidades)
     if entidades_brutas.strip():
-        for linha in entidades_brutas.strip().split("\n"):
-            entidade = linha.strip()
-            if entidade:
-                forma_normalizada = entidade.replace(" ", "_")
-                entidades.append({"Entidades nomeadas": entidade, "Palavra normalizada": forma_normalizada})
+        # Juntas às digitadas, as entradas de um dicionário salvo perdem o padrão já montado.
+        registros_entidades = entidades.registros if isinstance(entidades, DicionarioSalvo) else entidades
+        entidades = registros_entidades + processar_se_mudou("entidades", entidades_brutas, preparar_entidades)
 
     st.subheader("🔠 DICIONÁRIO DE SIGLAS")
-    siglas = []
-    num_siglas = st.number_input("Quantidade de siglas", min_value=0, max_value=100, value=0)
-
-    for i in range(num_siglas):
-        col1, col2 = st.columns(2)
-        with col1:
-            sigla = st.text_input(f"Sigla {i+1}", key=f"sigla_{i}")
-        with col2:
-            significado = st.text_input(f"Significado {i+1}", key=f"sign_{i}")
-        if sigla and significado:
-            significado_formatado = significado.lower().replace(" ", "_")
-            siglas.append({"Sigla": sigla, "Significado": significado_formatado})
+    arquivo_siglas = st.file_uploader("Importe um arquivo de siglas (CSV: sigla, significado)", type=["csv", "gz"])
+    siglas = editar_dicionario("siglas", arquivo_siglas)
 
-    
     st.subheader("📊 VARIÁVEIS POR TEXTO")
 
     st.markdown("**1. Definir campos de variáveis**")
@@ -161,155 +536,41 @@ with tabs[1]:
         if campo:
             campos_metadados.append(campo.strip())
 
-    metadados_por_texto = {}
-    if campos_metadados and textos:
-        st.markdown("**2. Preencher as opções das variáveis para cada texto**")
-        
-        dados = []
-        for texto in textos:
-            row = {"ID Texto": texto['id']}
-            for campo in campos_metadados:
-                row[campo] = ""
-            dados.append(row)
-        
-        df_metadados = pd.DataFrame(dados)
-        df_editado = st.data_editor(
-            df_metadados,
-            column_config={"ID Texto": st.column_config.Column(disabled=True)},
-            hide_index=True,
-            use_container_width=True
-        )
-
-        for _, row in df_editado.iterrows():
-            metadados = {}
-            for campo in campos_metadados:
-                if pd.notna(row[campo]) and row[campo].strip():
-                    metadados[campo] = row[campo].strip()
-            metadados_por_texto[row['ID Texto']] = metadados
-
-    def converter_numeros_por_extenso(texto):
-        if not isinstance(texto, str):
-            return texto
-            
-        numeros = {
-            "zero": "0", "dois": "2", "duas": "2", 
-            "três": "3", "quatro": "4", "cinco": "5", "seis": "6", 
-            "sete": "7", "oito": "8", "nove": "9", "dez": "10",
-            "onze": "11", "doze": "12", "treze": "13", "quatorze": "14", 
-            "quinze": "15", "dezesseis": "16", "dezessete": "17", 
-            "dezoito": "18", "dezenove": "19", "vinte": "20",
-            "trinta": "30", "quarenta": "40", "cinquenta": "50", 
-            "sessenta": "60", "setenta": "70", "oitenta": "80", 
-            "noventa": "90", "cem": "100", "cento": "100",
-            "duzentos": "200", "trezentos": "300", "quatrocentos": "400",
-            "quinhentos": "500", "seiscentos": "600", "setecentos": "700",
-            "oitocentos": "800", "novecentos": "900", "mil": "1000"
-        }
+    arquivo_metadados = st.file_uploader("Ou importe as variáveis (CSV ou Parquet com a coluna \"ID Texto\" e uma coluna por variável)", type=["csv", "parquet", "gz"])
 
-        padrao = r"\b(" + "|".join(numeros.keys()) + r")\b"
-        
-        def substituir_numero(match):
-            return numeros[match.group(1).lower()]
-        
-        texto = re.sub(padrao, substituir_numero, texto, flags=re.IGNORECASE)
-        
-        return texto
-
-    def processar_palavras_com_se(texto):
-        if not isinstance(texto, str):
-            return texto
-        return re.sub(r"(\b\w+)-se\b", r"se \1", texto)
-
-    def processar_pronomes_pospostos(texto):
-        if not isinstance(texto, str):
-            return texto
-            
-        texto = re.sub(r'\b(\w+)-se\b', r'se \1', texto)
-        texto = re.sub(r'\b(\w+)-([oa]s?)\b', r'\2 \1', texto)
-        texto = re.sub(r'\b(\w+)-(lhe|lhes)\b', r'\2 \1', texto)
-        texto = re.sub(r'\b(\w+)-(me|te|nos|vos)\b', r'\2 \1', texto)
-        texto = re.sub(r'\b(\w+)[áéíóúâêô]?-([oa]s?)\b', r'\2 \1', texto)
-        texto = re.sub(r'\b(\w+)[áéíóúâêô]-(lo|la|los|las)-ia\b', r'\2 \1ia', texto)
-        return texto
-
-    def gerar_corpus(textos, entidades, siglas, metadados_por_texto):
-        dict_entidades = {e["Entidades nomeadas"].lower(): e["Palavra normalizada"].lower() for e in entidades}
-        dict_siglas = {s["Sigla"].lower(): s["Significado"] for s in siglas}
-        caracteres_especiais = {
-            "-": "Hífen", ";": "Ponto e vírgula", '"': "Aspas duplas", "'": "Aspas simples", "…": "Reticências", "–": "Travessão", "(": "Parêntese esquerdo", ")": "Parêntese direito", "/": "Barra", "%": "Porcentagem", "[": "Colchete esquerdo", "]": "Colchete direito","{": "Chave esquerda", "}": "Chave direita", "&": "E comercial", "*": "Asterisco","@": "Arroba", "#": "Cerquilha", "$": "Cifrão", "+": "Mais", "=": "Igual","<": "Menor que", ">": "Maior que", "\\": "Barra invertida", "|": "Barra vertical",       "~": "Til", "`": "Acento grave", "^": "Circunflexo"
-           
-        }
+    ids_textos = [texto["id"] for texto in textos] if isinstance(textos, list) else None
+    tabela_metadados = editar_metadados(ids_textos, campos_metadados, arquivo_metadados)
 
-        contagem_caracteres = {k: 0 for k in caracteres_especiais}
-        total_textos = total_siglas = total_entidades = total_remocoes = 0
-        corpus_final = ""
-
-        for texto_info in textos:
-            texto = texto_info["texto"]
-            id_val = texto_info["id"]
-            if not texto.strip():
-                continue
-
-            texto_corrigido = texto.lower()
-            texto_corrigido = converter_numeros_por_extenso(texto_corrigido)
-            texto_corrigido = processar_palavras_com_se(texto_corrigido)
-            texto_corrigido = processar_pronomes_pospostos(texto_corrigido)
-            total_textos += 1
-
-            for sigla, significado in dict_siglas.items():
-                texto_corrigido = re.sub(rf"\({sigla}\)", "", texto_corrigido)
-                texto_corrigido = re.sub(rf"\b{sigla}\b", significado, texto_corrigido, flags=re.IGNORECASE)
-                total_siglas += 1
-
-            for termo, substituto in dict_entidades.items():
-                if termo in texto_corrigido:
-                    texto_corrigido = re.sub(rf"\b{termo}\b", substituto, texto_corrigido, flags=re.IGNORECASE)
-                    total_entidades += 1
-
-            for char in caracteres_especiais:
-                count = texto_corrigido.count(char)
-                if count:
-                    if char in ['"', "'"]:
-                        texto_corrigido = texto_corrigido.replace(char, "")
-                    else:
-                        texto_corrigido = texto_corrigido.replace(char, "_por_cento" if char == "%" else "_")
-                    contagem_caracteres[char] += count
-                    total_remocoes += count
-
-            texto_corrigido = re.sub(r"\s+", " ", texto_corrigido.strip())
-
-            metadata = f"**** *ID_{id_val}"
-            for k, v in metadados_por_texto.get(id_val, {}).items():
-                if v:
-                    metadata += f" *{k.replace(' ', '_')}_{v.replace(' ', '_')}"
-            
-            corpus_final += f"{metadata}\n{texto_corrigido}\n"
-
-        estatisticas = f"Textos processados: {total_textos}\nSiglas substituídas: {total_siglas}\n"
-        estatisticas += f"Entidades substituídas: {total_entidades}\nCaracteres especiais removidos: {total_remocoes}\n"
-        for c, label in caracteres_especiais.items():
-            if contagem_caracteres[c] > 0:
-                estatisticas += f" - {label} ({c}) : {contagem_caracteres[c]}\n"
-
-        return corpus_final, estatisticas
+    with st.expander("⚙️ Configurações da geração"):
+        processos_geracao = st.number_input("Processos paralelos", min_value=1, max_value=os.cpu_count() or 1, value=1, key="processos_geracao")
 
     if st.button("🚀 GERAR CORPUS TEXTUAL"):
-        if textos:
-            corpus, estatisticas = gerar_corpus(textos, entidades, siglas, metadados_por_texto)
-            if corpus.strip():
-                st.success("Corpus gerado com sucesso!")
-                st.subheader("📄 CORPUS TEXTUAL GERADO")
-                st.text_area("🔍 Revise antes de salvar", corpus, height=300)
-                st.text_area("📊 Estatísticas do processamento", estatisticas, height=250)
-
-                buf = io.BytesIO()
-                buf.write(corpus.encode("utf-8"))
-                st.download_button("💾 SALVAR CORPUS TEXTUAL", data=buf.getvalue(), file_name="corpus_IRaMuTeQ.txt", mime="text/plain")
+        if tem_textos:
+            arquivos = {}
+            if arquivo_textos is not None:
+                # Gravado na pasta da tarefa, que o lê de lá em fluxo, independente do upload da sessão.
+                textos = f"entrada_{os.path.basename(arquivo_textos.name)}"
+                arquivos[textos] = arquivo_textos
+                total = None
             else:
-                st.warning("Nenhum corpus gerado.")
+                total = sum(1 for texto in textos if texto["texto"].strip())
+            cabecalhos = cabecalhos_metadados(tabela_metadados) if tabela_metadados is not None else None
+            submeter_tarefa("gerar", tarefa_gerar_corpus, textos, entidades, siglas, cabecalhos,
+                            executor_tarefas().processos_por_tarefa(int(processos_geracao)),
+                            st.session_state.setdefault("cache_corpus", CacheCorpus()), nova_instrumentacao(),
+                            total=total, arquivos=arquivos)
         else:
             st.warning("Por favor, insira pelo menos um texto para processar.")
 
+    tarefa_geracao = tarefa_da_sessao("gerar")
+    if tarefa_geracao is not None:
+        if tarefa_geracao.ativa:
+            painel_tarefa(tarefa_geracao, "gerar")
+        elif tarefa_geracao.situacao == CONCLUIDA:
+            mostrar_corpus(tarefa_geracao)
+        else:
+            mostrar_fim_tarefa(tarefa_geracao)
+
 
 with tabs[2]:
     st.header("")
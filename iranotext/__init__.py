@@ -0,0 +1,17 @@
+# Pipeline de preparação de corpus textual para o IRaMuTeQ, independente do Streamlit.
+from iranotext.analise import detectar_palavras_compostas, detectar_siglas, indexar_entidades
+from iranotext.cache import CacheCorpus
+from iranotext.corpus import EstatisticasCorpus, cabecalhos_metadados, escrever_corpus, gerar_corpus, preparar_textos
+from iranotext.dicionarios import SubstituidorDicionario, preparar_entidades, preparar_sigla
+from iranotext.indice import IndiceTermos, indexar_siglas
+from iranotext.instrumentacao import Instrumentacao
+from iranotext.normalizacao import (
+    PipelineNormalizacao,
+    converter_numeros_por_extenso,
+    normalizar_texto,
+    processar_palavras_com_se,
+    processar_pronomes_pospostos,
+)
+from iranotext.repositorio import DicionarioSalvo, RepositorioDicionarios
+from iranotext.sanitizacao import sanitizar_texto
+from iranotext.tarefas import ExecutorTarefas
@@ -0,0 +1,5 @@
+import sys
+
+from iranotext.cli import main
+
+sys.exit(main())
@@ -0,0 +1,96 @@
+import logging
+import re
+import threading
+import time
+
+from iranotext.indice import IndiceTermos
+from iranotext.instrumentacao import medir_opcional, tamanho_utf8
+
+logger = logging.getLogger(__name__)
+
+MODELO_SPACY = "pt_core_news_sm"
+COMPONENTES_NER = ("ner",)
+LIMITE_CARACTERES_DOC = 10000
+TAMANHO_LOTE_NER = 64
+
+_modelo_nlp = None
+_trava_modelo = threading.Lock()
+
+
+def carregar_modelo_nlp():
+    # Carregado uma única vez por processo e compartilhado por quem chamar depois.
+    # O spaCy só é importado aqui, e apenas o tokenizador e os componentes do NER são mantidos.
+    # O tok2vec compartilhado só fica se o NER o escutar; no pt_core_news_sm o NER tem o seu
+    # próprio e o tok2vec seria calculado à toa.
+    global _modelo_nlp
+    with _trava_modelo:
+        if _modelo_nlp is None:
+            inicio = time.perf_counter()
+            import spacy
+
+            meta = spacy.util.get_model_meta(spacy.util.get_package_path(MODELO_SPACY))
+            componentes = meta.get("components", meta.get("pipeline", []))
+            excluir = [c for c in componentes if c not in COMPONENTES_NER and c != "tok2vec"]
+            _modelo_nlp = spacy.load(MODELO_SPACY, exclude=excluir)
+            if "tok2vec" in _modelo_nlp.pipe_names and not set(COMPONENTES_NER) & set(_modelo_nlp.get_pipe("tok2vec").listening_components):
+                _modelo_nlp.remove_pipe("tok2vec")
+            logger.info("Modelo %s carregado em %.2f s (componentes: %s)", MODELO_SPACY, time.perf_counter() - inicio, ", ".join(_modelo_nlp.pipe_names))
+    return _modelo_nlp
+
+
+def detectar_siglas(texto):
+    tokens = re.findall(r"\b[A-Z]{2,}\b", texto)
+    return sorted(set(tokens))
+
+
+def dividir_em_documentos(texto, limite=LIMITE_CARACTERES_DOC):
+    # Cada linha é um documento; linhas longas são divididas em trechos nos limites de sentença.
+    for num_linha, linha in enumerate(texto.split("\n")):
+        linha = linha.strip()
+        if not linha:
+            continue
+        if len(linha) <= limite:
+            yield linha, num_linha
+            continue
+
+        trecho = ""
+        for sentenca in re.split(r"(?<=[.!?;])\s+", linha):
+            while len(sentenca) > limite:
+                if trecho:
+                    yield trecho, num_linha
+                    trecho = ""
+                yield sentenca[:limite], num_linha
+                sentenca = sentenca[limite:]
+            if trecho and len(trecho) + 1 + len(sentenca) > limite:
+                yield trecho, num_linha
+                trecho = ""
+            trecho = f"{trecho} {sentenca}" if trecho else sentenca
+        if trecho:
+            yield trecho, num_linha
+
+
+def indexar_entidades(texto, tamanho_lote=TAMANHO_LOTE_NER, processos=1, nlp=None, indice=None, instrumentacao=None, progresso=None):
+    # Índice das entidades nomeadas com mais de uma palavra, por linha do texto.
+    # `progresso`, se informado, é chamado a cada documento com o número de linhas já percorridas.
+    if nlp is None:
+        with medir_opcional(instrumentacao, "carregar_modelo"):
+            nlp = carregar_modelo_nlp()
+    if indice is None:
+        indice = IndiceTermos()
+    limite = min(LIMITE_CARACTERES_DOC, nlp.max_length)
+    with medir_opcional(instrumentacao, "ner", bytes_entrada=tamanho_utf8(texto) if instrumentacao else 0) as medicao:
+        docs = nlp.pipe(dividir_em_documentos(texto, limite), as_tuples=True, batch_size=tamanho_lote, n_process=processos)
+        for doc, num_linha in docs:
+            if medicao is not None:
+                medicao.textos += 1
+            if progresso is not None:
+                progresso(num_linha + 1)
+            for ent in doc.ents:
+                if len(ent.text.split()) > 1:
+                    indice.adicionar(ent.text, num_linha)
+    return indice
+
+
+def detectar_palavras_compostas(texto, tamanho_lote=TAMANHO_LOTE_NER, processos=1, nlp=None):
+    # Retorna {entidade: número de linhas (documentos) em que aparece}.
+    return indexar_entidades(texto, tamanho_lote, processos, nlp).frequencias_documentos()
@@ -0,0 +1,255 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import Counter, OrderedDict
+
+from iranotext.corpus import ResultadoTexto
+from iranotext.dicionarios import padrao_trie
+from iranotext.normalizacao import PIPELINE_PADRAO
+
+VERSAO_CACHE = 1
+FORMATO_ARQUIVO_CACHE = 1
+LIMITE_CARACTERES_CACHE = 50_000_000
+
+# Posições de cada entrada do cache.
+NORMALIZADO, RESULTADO, COM_SIGLAS, TERMOS_SIGLAS, TERMOS_ENTIDADES = range(5)
+
+
+def chave_texto(texto):
+    return hashlib.blake2b(texto.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+def termos_alterados(antigo, novo):
+    return [termo for termo in antigo.keys() | novo.keys() if antigo.get(termo) != novo.get(termo)]
+
+
+def tamanho_entrada(entrada):
+    tamanho = len(entrada[NORMALIZADO])
+    if entrada[RESULTADO] is not None:
+        tamanho += len(entrada[RESULTADO].saida)
+    if entrada[COM_SIGLAS] is not None:
+        tamanho += len(entrada[COM_SIGLAS])
+    return tamanho
+
+
+class CacheCorpus:
+    # Guarda, por hash do conteúdo de cada texto, o texto já normalizado e o resultado final
+    # (texto do corpus e estatísticas). Índices invertidos ligam cada sigla e entidade dos
+    # dicionários aos textos em que foram encontradas. Quando os dicionários mudam, perdem o
+    # resultado só os textos com termos removidos ou alterados (pelos índices) ou com termos
+    # incluídos (por uma varredura dos textos guardados); a normalização é mantida.
+    # Os textos menos usados recentemente são descartados acima de `max_caracteres`.
+    # Não é seguro entre threads: quem o compartilha (ex.: tarefas do aplicativo) usa `trava`.
+    def __init__(self, max_caracteres=LIMITE_CARACTERES_CACHE):
+        self.max_caracteres = max_caracteres
+        self.trava = threading.Lock()
+        self.versao = self.versao_atual()
+        self.limpar()
+
+    @staticmethod
+    def versao_atual():
+        return f"{VERSAO_CACHE}:{','.join(PIPELINE_PADRAO.nomes)}"
+
+    def limpar(self):
+        self._entradas = OrderedDict()
+        self._indice_siglas = {}
+        self._indice_entidades = {}
+        self._caracteres = 0
+        self._siglas = {}
+        self._entidades = {}
+        self.aproveitados = 0
+        self.recalculados = 0
+        self.invalidados = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def sincronizar(self, siglas, entidades):
+        # Chamado no início de cada geração com os dicionários já preparados (termo -> substituto).
+        versao = self.versao_atual()
+        if versao != self.versao:
+            self.limpar()
+            self.versao = versao
+        self.aproveitados = self.recalculados = self.invalidados = 0
+
+        afetados = set()
+        for indice, antigo, novo, posicao_texto in ((self._indice_siglas, self._siglas, siglas, NORMALIZADO),
+                                                    (self._indice_entidades, self._entidades, entidades, COM_SIGLAS)):
+            alterados = termos_alterados(antigo, novo)
+            for termo in alterados:
+                afetados.update(indice.get(termo, ()))
+            incluidos = [termo for termo in alterados if termo not in antigo]
+            if incluidos:
+                afetados.update(self._procurar(incluidos, posicao_texto))
+
+        for chave in afetados:
+            self._invalidar(chave)
+        self._siglas = dict(siglas)
+        self._entidades = dict(entidades)
+
+    def _procurar(self, termos, posicao_texto):
+        # Textos (ainda válidos) em que algum dos termos aparece; as entidades são procuradas
+        # no texto após a troca das siglas, como na geração.
+        padrao = re.compile(rf"(?<!\w)(?:{padrao_trie(termos)})(?!\w)")
+        for chave, entrada in self._entradas.items():
+            if entrada[RESULTADO] is None:
+                continue
+            texto = entrada[posicao_texto]
+            if texto is None:
+                texto = entrada[NORMALIZADO]
+            if padrao.search(texto):
+                yield chave
+
+    def _invalidar(self, chave):
+        entrada = self._entradas.get(chave)
+        if entrada is not None and entrada[RESULTADO] is not None:
+            self._caracteres -= tamanho_entrada(entrada)
+            entrada[RESULTADO] = entrada[COM_SIGLAS] = None
+            self._caracteres += tamanho_entrada(entrada)
+            self.invalidados += 1
+
+    def consultar(self, texto):
+        # Devolve (chave, resultado ou None, texto normalizado ou None).
+        chave = chave_texto(texto)
+        entrada = self._entradas.get(chave)
+        if entrada is None:
+            return chave, None, None
+        self._entradas.move_to_end(chave)
+        if entrada[RESULTADO] is not None:
+            self.aproveitados += 1
+        return chave, entrada[RESULTADO], entrada[NORMALIZADO]
+
+    def guardar(self, chave, resultado, normalizado, texto_com_siglas, termos_siglas, termos_entidades):
+        anterior = self._entradas.pop(chave, None)
+        if anterior is not None:
+            self._remover(chave, anterior)
+        entrada = [normalizado, resultado, texto_com_siglas if texto_com_siglas != normalizado else None,
+                   tuple(termos_siglas), tuple(termos_entidades)]
+        self._incluir(chave, entrada)
+        self.recalculados += 1
+
+        while self._caracteres > self.max_caracteres and len(self._entradas) > 1:
+            self._remover(*self._entradas.popitem(last=False))
+
+    def _incluir(self, chave, entrada):
+        self._entradas[chave] = entrada
+        self._caracteres += tamanho_entrada(entrada)
+        for termo in entrada[TERMOS_SIGLAS]:
+            self._indice_siglas.setdefault(termo, set()).add(chave)
+        for termo in entrada[TERMOS_ENTIDADES]:
+            self._indice_entidades.setdefault(termo, set()).add(chave)
+
+    def _remover(self, chave, entrada):
+        self._caracteres -= tamanho_entrada(entrada)
+        for indice, termos in ((self._indice_siglas, entrada[TERMOS_SIGLAS]), (self._indice_entidades, entrada[TERMOS_ENTIDADES])):
+            for termo in termos:
+                chaves = indice.get(termo)
+                if chaves is not None:
+                    chaves.discard(chave)
+                    if not chaves:
+                        del indice[termo]
+
+    def processar(self, processador, texto):
+        chave, resultado, normalizado = self.consultar(texto)
+        if resultado is None:
+            if normalizado is None:
+                normalizado = processador.normalizar(texto)
+            termos_siglas, termos_entidades = set(), set()
+            resultado, texto_com_siglas = processador.finalizar(normalizado, termos_siglas, termos_entidades)
+            self.guardar(chave, resultado, normalizado, texto_com_siglas, termos_siglas, termos_entidades)
+        return resultado
+
+    def formatar(self):
+        return (f"Cache: {self.aproveitados} textos reaproveitados, {self.recalculados} recalculados "
+                f"({self.invalidados} invalidados por mudanças nos dicionários)")
+
+    def salvar(self, caminho):
+        # JSON (comprimido com gzip se o nome terminar em .gz). Os índices não são gravados;
+        # são reconstruídos ao carregar.
+        dados = {
+            "formato": FORMATO_ARQUIVO_CACHE,
+            "versao": self.versao,
+            "siglas": self._siglas,
+            "entidades": self._entidades,
+            "entradas": [[chave.hex(), _entrada_para_json(entrada)] for chave, entrada in self._entradas.items()],
+        }
+        conteudo = json.dumps(dados, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if caminho.lower().endswith(".gz"):
+            conteudo = gzip.compress(conteudo, compresslevel=1)
+        diretorio = os.path.dirname(os.path.abspath(caminho))
+        descritor, temporario = tempfile.mkstemp(dir=diretorio, prefix=".iranotext_cache_")
+        try:
+            with os.fdopen(descritor, "wb") as arquivo:
+                arquivo.write(conteudo)
+            os.replace(temporario, caminho)
+        except BaseException:
+            os.unlink(temporario)
+            raise
+
+    @classmethod
+    def carregar(cls, caminho, max_caracteres=LIMITE_CARACTERES_CACHE):
+        # Um arquivo ausente ou de outra versão do pipeline resulta em um cache vazio; um arquivo
+        # que não seja um cache válido gera ValueError.
+        cache = cls(max_caracteres)
+        if not os.path.exists(caminho):
+            return cache
+        abrir = gzip.open if caminho.lower().endswith(".gz") else open
+        try:
+            with abrir(caminho, "rb") as arquivo:
+                dados = json.load(arquivo)
+        except (OSError, UnicodeDecodeError, json.JSONDecodeError) as erro:
+            raise ValueError(f"{caminho}: não é um arquivo de cache válido ({erro})") from None
+        if not isinstance(dados, dict) or dados.get("formato") != FORMATO_ARQUIVO_CACHE:
+            raise ValueError(f"{caminho}: formato de cache não suportado")
+        if dados.get("versao") != cache.versao:
+            return cache
+        try:
+            siglas, entidades = _termos_de_json(dados["siglas"]), _termos_de_json(dados["entidades"])
+            entradas = [(bytes.fromhex(chave), _entrada_de_json(entrada)) for chave, entrada in dados["entradas"]]
+        except (AttributeError, KeyError, TypeError, ValueError) as erro:
+            raise ValueError(f"{caminho}: cache corrompido ({erro})") from None
+        cache._siglas = siglas
+        cache._entidades = entidades
+        for chave, entrada in entradas:
+            cache._incluir(chave, entrada)
+        return cache
+
+
+def _entrada_para_json(entrada):
+    resultado = entrada[RESULTADO]
+    if resultado is not None:
+        resultado = [resultado.saida, resultado.siglas, resultado.entidades, resultado.caracteres]
+    return [entrada[NORMALIZADO], resultado, entrada[COM_SIGLAS], list(entrada[TERMOS_SIGLAS]), list(entrada[TERMOS_ENTIDADES])]
+
+
+def _texto(valor, opcional=False):
+    if isinstance(valor, str) or (opcional and valor is None):
+        return valor
+    raise TypeError(f"esperado texto, encontrado {type(valor).__name__}")
+
+
+def _inteiro(valor):
+    if isinstance(valor, int) and not isinstance(valor, bool):
+        return valor
+    raise TypeError(f"esperado inteiro, encontrado {type(valor).__name__}")
+
+
+def _termos_de_json(termos):
+    if not isinstance(termos, dict):
+        raise TypeError(f"esperado objeto, encontrado {type(termos).__name__}")
+    return {_texto(termo): _texto(substituto) for termo, substituto in termos.items()}
+
+
+def _entrada_de_json(entrada):
+    normalizado, resultado, com_siglas, termos_siglas, termos_entidades = entrada
+    if resultado is not None:
+        saida, siglas, entidades, caracteres = resultado
+        if caracteres is not None:
+            caracteres = Counter({_texto(c): _inteiro(n) for c, n in caracteres.items()})
+        resultado = ResultadoTexto(_texto(saida), _inteiro(siglas), _inteiro(entidades), caracteres)
+    return [_texto(normalizado), resultado, _texto(com_siglas, opcional=True),
+            tuple(map(_texto, termos_siglas)), tuple(map(_texto, termos_entidades))]
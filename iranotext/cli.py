@@ -0,0 +1,152 @@
+import argparse
+import sys
+
+from iranotext.analise import TAMANHO_LOTE_NER, indexar_entidades
+from iranotext.cache import CacheCorpus
+from iranotext.corpus import TAMANHO_BLOCO, EstatisticasCorpus, cabecalhos_metadados, escrever_corpus, gerar_corpus
+from iranotext.indice import COLUNAS_ORDENACAO, indexar_siglas
+from iranotext.ingestao import FORMATOS, ler_entidades, ler_metadados, ler_siglas, ler_textos
+from iranotext.instrumentacao import Instrumentacao, ativar_log_json, medir_opcional
+from iranotext.repositorio import EXTENSAO_DICIONARIO, TIPOS_DICIONARIO, DicionarioSalvo, RepositorioDicionarios
+
+
+def ler_arquivo(caminho):
+    with open(caminho, encoding="utf-8") as arquivo:
+        return arquivo.read()
+
+
+def ler_dicionario(caminho, tipo):
+    # CSV/TXT, ou um dicionário salvo (.iradic), que já vem com as chaves normalizadas e o padrão montado.
+    if caminho.endswith(EXTENSAO_DICIONARIO):
+        dicionario = DicionarioSalvo.carregar(caminho)
+        if dicionario.tipo != tipo:
+            raise SystemExit(f"{caminho}: é um dicionário de {dicionario.tipo}, não de {tipo}")
+        return dicionario
+    return ler_siglas(caminho) if tipo == "siglas" else ler_entidades(caminho)
+
+
+def comando_gerar(args):
+    textos = ler_textos(args.textos, args.formato, args.coluna_texto, args.coluna_id)
+    try:
+        entidades = ler_dicionario(args.entidades, "entidades") if args.entidades else []
+        siglas = ler_dicionario(args.siglas, "siglas") if args.siglas else []
+        cabecalhos = cabecalhos_metadados(ler_metadados(args.metadados)) if args.metadados else None
+        cache = CacheCorpus.carregar(args.cache) if args.cache else None
+    except (OSError, ValueError) as erro:
+        raise SystemExit(f"erro: {erro}") from None
+    estatisticas = EstatisticasCorpus()
+    registros = gerar_corpus(textos, entidades, siglas, cabecalhos, estatisticas, args.processos, args.tamanho_bloco, cache, args.instrumentacao)
+    # Os textos são lidos em fluxo: um arquivo ausente ou com erro de formato só aparece durante a geração.
+    try:
+        if args.saida == "-":
+            escrever_corpus(registros, sys.stdout, num_previa=0)
+        else:
+            with open(args.saida, "w", encoding="utf-8", newline="") as arquivo:
+                escrever_corpus(registros, arquivo, num_previa=0)
+    except (OSError, ValueError) as erro:
+        raise SystemExit(f"erro: {erro}") from None
+
+    if args.estatisticas:
+        with open(args.estatisticas, "w", encoding="utf-8") as arquivo:
+            arquivo.write(estatisticas.formatar())
+    else:
+        sys.stderr.write(estatisticas.formatar())
+    if cache is not None:
+        cache.salvar(args.cache)
+        sys.stderr.write(cache.formatar() + "\n")
+    return 0 if estatisticas.total_textos else 1
+
+
+def comando_analisar(args):
+    texto = ler_arquivo(args.textos)
+    with medir_opcional(args.instrumentacao, "indice_siglas"):
+        indice_siglas = indexar_siglas(texto)
+    print("# SIGLAS DETECTADAS\tocorrências\ttextos\texpansão provável")
+    for linha in indice_siglas.tabela(indice_siglas.ordenar(args.ordenar, min_textos=args.min_textos)):
+        print(f"{linha['termo']}\t{linha['ocorrencias']}\t{linha['textos']}\t{linha['expansao']}")
+    if args.ner:
+        indice_entidades = indexar_entidades(texto, args.lote, args.processos, instrumentacao=args.instrumentacao)
+        print("\n# ENTIDADES NOMEADAS\tocorrências\ttextos")
+        for linha in indice_entidades.tabela(indice_entidades.ordenar(args.ordenar, min_textos=args.min_textos)):
+            print(f"{linha['termo']}\t{linha['ocorrencias']}\t{linha['textos']}")
+    return 0
+
+
+def comando_dicionarios(args):
+    repositorio = RepositorioDicionarios(args.diretorio) if args.diretorio else RepositorioDicionarios()
+    if args.acao == "listar":
+        for tipo in TIPOS_DICIONARIO:
+            for nome in repositorio.nomes(tipo):
+                versoes = repositorio.versoes(tipo, nome)
+                ultimo = repositorio.carregar(tipo, nome, versoes[-1])
+                print(f"{tipo}\t{nome}\tv{versoes[-1]}\t{len(ultimo)} entradas\t{ultimo.criado}")
+        return 0
+    if not args.tipo or not args.nome:
+        raise SystemExit(f"dicionarios {args.acao}: informe o tipo e o nome")
+    if args.acao == "importar":
+        if not args.arquivo:
+            raise SystemExit("dicionarios importar: informe o arquivo CSV/TXT")
+        registros = ler_siglas(args.arquivo) if args.tipo == "siglas" else ler_entidades(args.arquivo)
+        dicionario = repositorio.salvar(args.tipo, args.nome, registros)
+        print(f"{dicionario.nome} v{dicionario.versao}: {len(dicionario)} entradas em {repositorio.caminho(args.tipo, args.nome, dicionario.versao)}")
+        return 0
+    dicionario = repositorio.carregar(args.tipo, args.nome, args.versao)
+    if args.arquivo and args.arquivo != "-":
+        with open(args.arquivo, "w", encoding="utf-8", newline="") as arquivo:
+            arquivo.write(dicionario.exportar_csv())
+    else:
+        sys.stdout.write(dicionario.exportar_csv())
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="iranotext", description="Preparação de corpus textual para o IRaMuTeQ.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    # Opções comuns aos subcomandos.
+    desempenho = argparse.ArgumentParser(add_help=False)
+    desempenho.add_argument("--desempenho", action="store_true", help="emite o tempo, textos/s e bytes de cada etapa em JSON na saída de erro")
+    desempenho.add_argument("--memoria", action="store_true", help="com --desempenho, mede também o pico de memória de cada etapa (tracemalloc; bem mais lento)")
+    desempenho.add_argument("--perfil", help="grava um perfil do cProfile (pstats) da execução neste arquivo")
+
+    gerar = subparsers.add_parser("gerar", parents=[desempenho], help="gera o corpus textual")
+    gerar.add_argument("textos", help="arquivo com os textos: TXT (um por linha), CSV ou JSONL, opcionalmente .gz")
+    gerar.add_argument("--formato", choices=FORMATOS, help="formato do arquivo de textos (padrão: pela extensão)")
+    gerar.add_argument("--coluna-texto", default="texto", help="coluna/campo com o texto em CSV e JSONL")
+    gerar.add_argument("--coluna-id", default="id", help="coluna/campo com o identificador em CSV e JSONL")
+    gerar.add_argument("-o", "--saida", default="corpus_IRaMuTeQ.txt", help="arquivo do corpus gerado ('-' para a saída padrão)")
+    gerar.add_argument("--entidades", help="dicionário de entidades nomeadas: uma por linha, CSV (entidade[,forma normalizada]) ou .iradic")
+    gerar.add_argument("--siglas", help="dicionário de siglas em CSV (sigla,significado) ou .iradic")
+    gerar.add_argument("--metadados", help="variáveis por texto em CSV ou Parquet, com a coluna 'ID Texto'")
+    gerar.add_argument("--estatisticas", help="arquivo para as estatísticas (padrão: saída de erro)")
+    gerar.add_argument("--processos", type=int, default=1, help="processos paralelos (padrão: 1)")
+    gerar.add_argument("--tamanho-bloco", type=int, default=TAMANHO_BLOCO, help="textos por bloco enviado a cada processo")
+    gerar.add_argument("--cache", help="arquivo de cache: só textos novos ou afetados por mudanças nos dicionários são reprocessados")
+    gerar.set_defaults(funcao=comando_gerar)
+
+    analisar = subparsers.add_parser("analisar", parents=[desempenho], help="detecta siglas e, com --ner, entidades nomeadas")
+    analisar.add_argument("textos", help="arquivo com os textos (um por linha)")
+    analisar.add_argument("--ner", action="store_true", help="detecta entidades nomeadas com o spaCy")
+    analisar.add_argument("--lote", type=int, default=TAMANHO_LOTE_NER, help="textos por lote no NER")
+    analisar.add_argument("--processos", type=int, default=1, help="processos paralelos no NER")
+    analisar.add_argument("--ordenar", choices=COLUNAS_ORDENACAO, default="textos", help="ordem dos termos (padrão: textos)")
+    analisar.add_argument("--min-textos", type=int, default=1, help="só termos presentes em pelo menos N textos")
+    analisar.set_defaults(funcao=comando_analisar)
+
+    dicionarios = subparsers.add_parser("dicionarios", help="importa, exporta e lista dicionários salvos (versionados)")
+    dicionarios.add_argument("acao", choices=("listar", "importar", "exportar"))
+    dicionarios.add_argument("tipo", nargs="?", choices=TIPOS_DICIONARIO)
+    dicionarios.add_argument("nome", nargs="?")
+    dicionarios.add_argument("arquivo", nargs="?", help="CSV/TXT a importar, ou destino do CSV exportado (padrão: saída padrão)")
+    dicionarios.add_argument("--versao", type=int, help="versão a exportar (padrão: a mais recente)")
+    dicionarios.add_argument("--diretorio", help="pasta dos dicionários salvos (padrão: $IRANOTEXT_DICIONARIOS ou ~/.iranotext/dicionarios)")
+    dicionarios.set_defaults(funcao=comando_dicionarios)
+
+    args = parser.parse_args(argv)
+    args.instrumentacao = None
+    if getattr(args, "desempenho", False) or getattr(args, "perfil", None):
+        ativar_log_json(sys.stderr)
+        args.instrumentacao = Instrumentacao(perfil=args.perfil, memoria=args.memoria)
+        with args.instrumentacao.perfilar():
+            return args.funcao(args)
+    return args.funcao(args)
@@ -0,0 +1,299 @@
+import multiprocessing
+import threading
+import time
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from iranotext.dicionarios import SubstituidorDicionario, dicionario_entidades, dicionario_siglas
+from iranotext.ingestao import COLUNA_ID
+from iranotext.instrumentacao import medir_opcional, tamanho_utf8
+from iranotext.normalizacao import normalizar_texto
+from iranotext.repositorio import DicionarioSalvo
+from iranotext.sanitizacao import CARACTERES_ESPECIAIS, sanitizar_texto
+
+NUM_REGISTROS_PREVIA = 50
+TAMANHO_BLOCO = 500
+
+# Resultado do processamento de um texto: o texto final e o que foi substituído/removido nele.
+ResultadoTexto = namedtuple("ResultadoTexto", ["saida", "siglas", "entidades", "caracteres"])
+
+
+class EstatisticasCorpus:
+    def __init__(self):
+        self.total_textos = 0
+        self.total_siglas = 0
+        self.total_entidades = 0
+        self.contagem_caracteres = Counter()
+
+    def acumular(self, resultado):
+        self.total_textos += 1
+        self.total_siglas += resultado.siglas
+        self.total_entidades += resultado.entidades
+        if resultado.caracteres:
+            self.contagem_caracteres.update(resultado.caracteres)
+
+    def formatar(self):
+        total_remocoes = sum(self.contagem_caracteres.values())
+        estatisticas = f"Textos processados: {self.total_textos}\nSiglas substituídas: {self.total_siglas}\n"
+        estatisticas += f"Entidades substituídas: {self.total_entidades}\nCaracteres especiais removidos: {total_remocoes}\n"
+        for c, label in CARACTERES_ESPECIAIS.items():
+            if self.contagem_caracteres[c] > 0:
+                estatisticas += f" - {label} ({c}) : {self.contagem_caracteres[c]}\n"
+        return estatisticas
+
+
+def preparar_textos(conteudo):
+    # Um texto por linha, identificados como texto_1, texto_2, ...
+    textos = []
+    if conteudo.strip():
+        for i, linha in enumerate(conteudo.strip().split("\n")):
+            textos.append({"id": f"texto_{i+1}", "texto": linha})
+    return textos
+
+
+class ProcessadorCorpus:
+    # Guarda os dicionários já compilados e processa um texto de cada vez. Os dicionários
+    # podem ser listas (como as de preparar_entidades/preparar_sigla) ou DicionarioSalvo.
+    # A normalização não depende dos dicionários; finalizar() aplica os dicionários e a
+    # sanitização e também devolve o texto logo após a troca das siglas. Os conjuntos
+    # opcionais recebem as siglas e entidades encontradas (usados pelo cache).
+    def __init__(self, entidades, siglas):
+        if isinstance(siglas, DicionarioSalvo):
+            self.substituidor_siglas = siglas.substituidor()
+        else:
+            self.substituidor_siglas = SubstituidorDicionario(dicionario_siglas(siglas), remover_parenteses=True)
+        if isinstance(entidades, DicionarioSalvo):
+            self.substituidor_entidades = entidades.substituidor()
+        else:
+            self.substituidor_entidades = SubstituidorDicionario(dicionario_entidades(entidades))
+
+    def normalizar(self, texto):
+        return normalizar_texto(texto.lower())
+
+    def finalizar(self, normalizado, termos_siglas=None, termos_entidades=None):
+        texto_com_siglas, n_siglas = self.substituidor_siglas.substituir(normalizado, termos_siglas)
+        texto_corrigido, n_entidades = self.substituidor_entidades.substituir(texto_com_siglas, termos_entidades)
+        caracteres = Counter()
+        saida = sanitizar_texto(texto_corrigido, caracteres)
+        return ResultadoTexto(saida, n_siglas, n_entidades, caracteres or None), texto_com_siglas
+
+    def processar(self, texto):
+        return self.finalizar(self.normalizar(texto))[0]
+
+
+class ProcessadorInstrumentado(ProcessadorCorpus):
+    # Mesmo processamento, medindo cada etapa em `instrumentacao`. Só é usado quando a
+    # instrumentação é pedida, para não custar nada no caminho normal.
+    def __init__(self, entidades, siglas, instrumentacao):
+        super().__init__(entidades, siglas)
+        self.instrumentacao = instrumentacao
+
+    def normalizar(self, texto):
+        inicio = time.perf_counter()
+        normalizado = super().normalizar(texto)
+        self.instrumentacao.acumular("normalizacao", time.perf_counter() - inicio, 1, tamanho_utf8(texto), tamanho_utf8(normalizado))
+        return normalizado
+
+    def finalizar(self, normalizado, termos_siglas=None, termos_entidades=None):
+        acumular = self.instrumentacao.acumular
+        inicio = time.perf_counter()
+        texto_com_siglas, n_siglas = self.substituidor_siglas.substituir(normalizado, termos_siglas)
+        meio = time.perf_counter()
+        texto_corrigido, n_entidades = self.substituidor_entidades.substituir(texto_com_siglas, termos_entidades)
+        fim = time.perf_counter()
+        caracteres = Counter()
+        saida = sanitizar_texto(texto_corrigido, caracteres)
+        acumular("siglas", meio - inicio, 1, tamanho_utf8(normalizado), tamanho_utf8(texto_com_siglas))
+        acumular("entidades", fim - meio, 1, tamanho_utf8(texto_com_siglas), tamanho_utf8(texto_corrigido))
+        acumular("sanitizacao", time.perf_counter() - fim, 1, tamanho_utf8(texto_corrigido), tamanho_utf8(saida))
+        return ResultadoTexto(saida, n_siglas, n_entidades, caracteres or None), texto_com_siglas
+
+
+def formatar_cabecalho(id_val, metadados):
+    metadata = f"**** *ID_{id_val}"
+    for k, v in metadados.items():
+        if v:
+            metadata += f" *{k.replace(' ', '_')}_{v.replace(' ', '_')}"
+    return metadata
+
+
+def _como_texto(coluna):
+    return coluna.astype(object).fillna("").astype(str).str.strip()
+
+
+def cabecalhos_metadados(tabela, coluna_id=COLUNA_ID):
+    # Os cabeçalhos de todos os textos de uma tabela de variáveis (uma linha por texto), montados
+    # coluna a coluna, sem percorrer as linhas. Mesmas regras de formatar_cabecalho: valores vazios
+    # são omitidos e espaços viram "_". Devolve {id do texto: cabeçalho}.
+    ids = _como_texto(tabela[coluna_id])
+    cabecalhos = "**** *ID_" + ids
+    for campo in tabela.columns:
+        variavel = str(campo).strip().replace(" ", "_")
+        if campo == coluna_id or not variavel:
+            continue
+        valores = _como_texto(tabela[campo])
+        cabecalhos += (f" *{variavel}_" + valores.str.replace(" ", "_", regex=False)).where(valores != "", "")
+    return dict(zip(ids, cabecalhos))
+
+
+def _cabecalho(id_val, cabecalhos):
+    cabecalho = cabecalhos.get(id_val)
+    return cabecalho if cabecalho is not None else formatar_cabecalho(id_val, {})
+
+
+def _textos_validos(textos):
+    for texto_info in textos:
+        if texto_info["texto"].strip():
+            yield texto_info["id"], texto_info["texto"]
+
+
+def _processar_serial(processador, itens, cache):
+    for id_val, texto in itens:
+        if cache is not None:
+            yield id_val, cache.processar(processador, texto)
+        else:
+            yield id_val, processador.processar(texto)
+
+
+_processador_worker = None
+
+
+def _iniciar_worker(processador):
+    # Executado uma vez por processo: os dicionários compilados chegam aqui uma única vez.
+    global _processador_worker
+    _processador_worker = processador
+
+
+def _processar_bloco(bloco, detalhado):
+    # bloco: lista de (texto, texto já normalizado ou None). Com `detalhado`, devolve também
+    # o que o cache guarda de cada texto, na ordem dos argumentos de CacheCorpus.guardar.
+    resultados = []
+    for texto, normalizado in bloco:
+        if normalizado is None:
+            normalizado = _processador_worker.normalizar(texto)
+        if detalhado:
+            termos_siglas, termos_entidades = set(), set()
+            resultado, texto_com_siglas = _processador_worker.finalizar(normalizado, termos_siglas, termos_entidades)
+            resultados.append((resultado, normalizado, texto_com_siglas, termos_siglas, termos_entidades))
+        else:
+            resultados.append(_processador_worker.finalizar(normalizado)[0])
+    return resultados
+
+
+def _dividir_em_blocos(itens, tamanho_bloco):
+    bloco = []
+    for item in itens:
+        bloco.append(item)
+        if len(bloco) >= tamanho_bloco:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+
+def _enviar_bloco(executor, bloco, cache):
+    if cache is None:
+        return bloco, None, executor.submit(_processar_bloco, [(texto, None) for _, texto in bloco], False)
+    consultas = [cache.consultar(texto) for _, texto in bloco]
+    faltantes = [(texto, normalizado) for (_, texto), (_, resultado, normalizado) in zip(bloco, consultas) if resultado is None]
+    futuro = executor.submit(_processar_bloco, faltantes, True) if faltantes else None
+    return bloco, consultas, futuro
+
+
+def _receber_bloco(bloco, consultas, futuro, cache):
+    calculados = iter(futuro.result() if futuro is not None else ())
+    if consultas is None:
+        for (id_val, _), resultado in zip(bloco, calculados):
+            yield id_val, resultado
+        return
+    for (id_val, _), (chave, resultado, _) in zip(bloco, consultas):
+        if resultado is None:
+            calculado = next(calculados)
+            cache.guardar(chave, *calculado)
+            resultado = calculado[0]
+        yield id_val, resultado
+
+
+def _contexto_processos():
+    # Fora da thread principal (ex.: nas tarefas do aplicativo), os processos não são criados
+    # por fork, que copiaria travas possivelmente em uso por outras threads, e sim a partir de
+    # um servidor de processos (forkserver) iniciado sem elas.
+    if threading.current_thread() is threading.main_thread() or multiprocessing.get_start_method() != "fork":
+        return None
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    return multiprocessing.get_context("forkserver")
+
+
+def _processar_em_paralelo(processador, itens, cache, processos, tamanho_bloco):
+    # Os blocos são enviados aos processos e lidos de volta na ordem de envio, com no máximo
+    # 2 blocos pendentes por processo para não carregar a entrada inteira na memória.
+    # Textos já presentes no cache não são enviados.
+    with ProcessPoolExecutor(max_workers=processos, mp_context=_contexto_processos(),
+                             initializer=_iniciar_worker, initargs=(processador,)) as executor:
+        pendentes = deque()
+        for bloco in _dividir_em_blocos(itens, tamanho_bloco):
+            pendentes.append(_enviar_bloco(executor, bloco, cache))
+            if len(pendentes) >= 2 * processos:
+                yield from _receber_bloco(*pendentes.popleft(), cache)
+        while pendentes:
+            yield from _receber_bloco(*pendentes.popleft(), cache)
+
+
+def _itens_medidos(itens, medicao):
+    for id_val, texto in itens:
+        medicao.textos += 1
+        medicao.bytes_entrada += tamanho_utf8(texto)
+        yield id_val, texto
+
+
+def gerar_corpus(textos, entidades, siglas, cabecalhos=None, estatisticas=None, processos=1, tamanho_bloco=TAMANHO_BLOCO, cache=None, instrumentacao=None):
+    # Gera os registros do corpus ("**** *ID_..." seguido do texto), um por texto não vazio.
+    # As estatísticas são acumuladas em `estatisticas` à medida que os registros são consumidos.
+    # Com processos > 1, os textos são divididos em blocos processados em paralelo; a saída é
+    # a mesma do modo serial. Com um CacheCorpus, só são recalculados os textos novos ou
+    # afetados por mudanças nos dicionários. Com uma Instrumentacao, cada etapa é medida
+    # (no modo paralelo, só a geração como um todo); sem ela, nada é medido. As variáveis de
+    # cada texto chegam em `cabecalhos` ({id: cabeçalho}, como os de cabecalhos_metadados);
+    # textos sem cabeçalho recebem só "**** *ID_<id>".
+    with medir_opcional(instrumentacao, "compilacao_dicionarios"):
+        if instrumentacao is not None and processos == 1:
+            processador = ProcessadorInstrumentado(entidades, siglas, instrumentacao)
+        else:
+            processador = ProcessadorCorpus(entidades, siglas)
+    if estatisticas is None:
+        estatisticas = EstatisticasCorpus()
+    if cabecalhos is None:
+        cabecalhos = {}
+
+    with medir_opcional(instrumentacao, "geracao_corpus") as medicao:
+        if cache is not None:
+            with medir_opcional(instrumentacao, "cache_sincronizacao"):
+                cache.sincronizar(processador.substituidor_siglas.dicionario, processador.substituidor_entidades.dicionario)
+
+        itens = _textos_validos(textos)
+        if medicao is not None:
+            itens = _itens_medidos(itens, medicao)
+        if processos > 1:
+            resultados = _processar_em_paralelo(processador, itens, cache, processos, tamanho_bloco)
+        else:
+            resultados = _processar_serial(processador, itens, cache)
+
+        for id_val, resultado in resultados:
+            estatisticas.acumular(resultado)
+            registro = f"{_cabecalho(id_val, cabecalhos)}\n{resultado.saida}\n"
+            if medicao is not None:
+                medicao.bytes_saida += tamanho_utf8(registro)
+            yield registro
+    if instrumentacao is not None:
+        instrumentacao.registrar()
+
+
+def escrever_corpus(registros, arquivo, num_previa=NUM_REGISTROS_PREVIA):
+    # Grava os registros em `arquivo` à medida que são gerados e devolve os primeiros para a prévia.
+    previa = []
+    for registro in registros:
+        arquivo.write(registro)
+        if len(previa) < num_previa:
+            previa.append(registro)
+    return previa
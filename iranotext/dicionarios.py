@@ -0,0 +1,106 @@
+import re
+from functools import lru_cache
+
+# Padrões já compilados ficam em memória: gerar de novo com os mesmos dicionários não recompila.
+TAMANHO_CACHE_PADROES = 8
+
+
+def _cadeia(char, no):
+    # Segue os nós com um único filho a partir da aresta `char`: devolve os caracteres da cadeia
+    # e o nó em que ela termina (com ramificação ou fim de termo).
+    chars = [char]
+    while len(no) == 1 and "" not in no:
+        (char, no), = no.items()
+        chars.append(char)
+    return "".join(chars), no
+
+
+def padrao_trie(termos):
+    # Monta uma alternância em forma de trie: prefixos comuns são fatorados e,
+    # em cada nó, o termo mais longo é tentado primeiro. Montada sem recursão e com as cadeias
+    # sem ramificação de uma vez, para que termos muito longos não esbarrem no limite de recursão.
+    raiz = {}
+    for termo in termos:
+        no = raiz
+        for char in termo:
+            no = no.setdefault(char, {})
+        no[""] = {}
+
+    arestas = {}
+    ordem = []
+    pilha = [raiz]
+    while pilha:
+        no = pilha.pop()
+        ordem.append(no)
+        arestas[id(no)] = [_cadeia(char, filho) for char, filho in sorted(no.items()) if char]
+        pilha.extend(fim for _, fim in arestas[id(no)])
+
+    padroes = {}
+    for no in reversed(ordem):
+        ramos = [re.escape(chars) + padroes[id(fim)] for chars, fim in arestas[id(no)]]
+        if not ramos:
+            padrao = ""
+        else:
+            padrao = ramos[0] if len(ramos) == 1 else "(?:" + "|".join(ramos) + ")"
+            padrao = f"(?:{padrao})?" if "" in no else padrao
+        padroes[id(no)] = padrao
+    return padroes[id(raiz)]
+
+
+@lru_cache(maxsize=TAMANHO_CACHE_PADROES)
+def compilar_padrao(padrao):
+    return re.compile(padrao)
+
+
+class SubstituidorDicionario:
+    # Substitui todos os termos de um dicionário em uma única varredura do texto.
+    # Com remover_parenteses, as formas "(termo)" são apagadas em vez de substituídas.
+    # `trie` permite reaproveitar um padrao_trie() já montado (ex.: de um dicionário salvo).
+    # Se `termos` for um conjunto, recebe os termos encontrados no texto.
+    def __init__(self, dicionario, remover_parenteses=False, trie=None):
+        self.dicionario = {termo: valor for termo, valor in dicionario.items() if termo}
+        self.padrao = None
+        if self.dicionario:
+            prefixo, sufixo = (r"(\()?", r"(?(1)\))") if remover_parenteses else ("()", "")
+            trie = trie if trie is not None else padrao_trie(self.dicionario)
+            self.padrao = compilar_padrao(rf"{prefixo}(?<!\w)({trie})(?!\w){sufixo}")
+
+    def substituir(self, texto, termos=None):
+        if self.padrao is None:
+            return texto, 0
+        contagem = 0
+
+        def trocar(match):
+            nonlocal contagem
+            if termos is not None:
+                termos.add(match.group(2))
+            if match.group(1):
+                return ""
+            contagem += 1
+            return self.dicionario[match.group(2)]
+
+        return self.padrao.sub(trocar, texto), contagem
+
+
+def preparar_entidades(conteudo):
+    # Uma entidade por linha; a forma normalizada une as palavras com "_".
+    entidades = []
+    for linha in conteudo.strip().split("\n"):
+        entidade = linha.strip()
+        if entidade:
+            forma_normalizada = entidade.replace(" ", "_")
+            entidades.append({"Entidades nomeadas": entidade, "Palavra normalizada": forma_normalizada})
+    return entidades
+
+
+def preparar_sigla(sigla, significado):
+    significado_formatado = significado.lower().replace(" ", "_")
+    return {"Sigla": sigla, "Significado": significado_formatado}
+
+
+def dicionario_entidades(entidades):
+    return {e["Entidades nomeadas"].lower(): e["Palavra normalizada"].lower() for e in entidades}
+
+
+def dicionario_siglas(siglas):
+    return {s["Sigla"].lower(): s["Significado"] for s in siglas}
@@ -0,0 +1,183 @@
+import re
+import unicodedata
+from array import array
+from collections import Counter
+from functools import lru_cache
+
+PADRAO_SIGLA = re.compile(r"\b[A-Z]{2,}\b")
+
+COLUNAS_ORDENACAO = ("ocorrencias", "textos", "termo")
+TAMANHO_CACHE_EXPANSOES = 16384
+
+
+def sem_acentos(texto):
+    # Mantém o comprimento do texto: cada caractere vira só a sua letra base.
+    if texto.isascii():
+        return texto
+    return "".join(unicodedata.normalize("NFD", char)[0] for char in texto)
+
+
+def expansao_da_sigla(sigla, texto, fim=None):
+    # Procura, nas palavras que antecedem "(SIGLA)" (o texto até `fim`), a menor sequência cujas
+    # letras contêm as da sigla em ordem, com a primeira no início de uma palavra (algoritmo de
+    # Schwartz e Hearst). Só a janela de min(|A| + 5, 2|A|) palavras é percorrida, de trás para
+    # a frente, para que linhas longas com muitas siglas não custem tempo quadrático.
+    fim = len(texto) if fim is None else fim
+    inicio = fim
+    for _ in range(min(len(sigla) + 5, 2 * len(sigla))):
+        while inicio > 0 and texto[inicio - 1].isspace():
+            inicio -= 1
+        while inicio > 0 and not texto[inicio - 1].isspace():
+            inicio -= 1
+        if not inicio:
+            break
+    return _expansao_do_candidato(sigla, " ".join(texto[inicio:fim].split()).rstrip(",;:-–"))
+
+
+@lru_cache(maxsize=TAMANHO_CACHE_EXPANSOES)
+def _expansao_do_candidato(sigla, candidato):
+    letras = sigla.lower()
+    minusculo = sem_acentos(candidato.lower())
+    pos = len(minusculo) - 1
+    for i in range(len(letras) - 1, -1, -1):
+        letra = letras[i]
+        while pos >= 0 and (minusculo[pos] != letra or (i == 0 and pos > 0 and minusculo[pos - 1].isalnum())):
+            pos -= 1
+        if pos < 0:
+            return None
+        pos -= 1
+    inicio = candidato.rfind(" ", 0, pos + 1) + 1
+    expansao = candidato[inicio:]
+    if len(expansao) <= len(sigla) or " " not in expansao:
+        return None
+    return expansao
+
+
+class IndiceTermos:
+    # Índice de termos de um conjunto de textos (linhas): para cada termo, o número de
+    # ocorrências, as linhas em que aparece e, para siglas, as expansões "Nome por Extenso (SIGLA)".
+    # Os termos recebem ids sequenciais; ocorrências ficam em um array e as linhas de cada termo
+    # em arrays próprios, adicionadas em ordem (o número de textos é o tamanho da lista).
+    def __init__(self):
+        self._ids = {}
+        self.termos = []
+        self._ocorrencias = array("I")
+        self._linhas = []
+        self._expansoes = {}
+
+    def __len__(self):
+        return len(self.termos)
+
+    def __contains__(self, termo):
+        return termo in self._ids
+
+    def __iter__(self):
+        return iter(self.termos)
+
+    def adicionar(self, termo, num_linha):
+        id_termo = self._ids.get(termo)
+        if id_termo is None:
+            id_termo = self._ids[termo] = len(self.termos)
+            self.termos.append(termo)
+            self._ocorrencias.append(0)
+            self._linhas.append(array("I"))
+        self._ocorrencias[id_termo] += 1
+        linhas = self._linhas[id_termo]
+        if not linhas or linhas[-1] != num_linha:
+            linhas.append(num_linha)
+        return id_termo
+
+    def adicionar_expansao(self, id_termo, expansao):
+        self._expansoes.setdefault(id_termo, Counter())[expansao] += 1
+
+    def ocorrencias(self, termo):
+        return self._ocorrencias[self._ids[termo]]
+
+    def num_textos(self, termo):
+        return len(self._linhas[self._ids[termo]])
+
+    def linhas(self, termo):
+        return self._linhas[self._ids[termo]]
+
+    def expansoes(self, termo):
+        return self._expansoes.get(self._ids[termo], Counter())
+
+    def frequencias_documentos(self):
+        return {termo: len(linhas) for termo, linhas in zip(self.termos, self._linhas)}
+
+    def ordenar(self, por="textos", filtro="", min_textos=1):
+        # Termos em ordem decrescente de textos ou ocorrências (ou alfabética), opcionalmente
+        # só os que contêm `filtro` e aparecem em pelo menos `min_textos` linhas.
+        if por not in COLUNAS_ORDENACAO:
+            raise ValueError(f"ordenação desconhecida: {por}")
+        filtro = filtro.lower()
+        ids = [i for i, termo in enumerate(self.termos)
+               if len(self._linhas[i]) >= min_textos and (not filtro or filtro in termo.lower())]
+        if por == "termo":
+            ids.sort(key=lambda i: self.termos[i])
+        elif por == "textos":
+            ids.sort(key=lambda i: (-len(self._linhas[i]), -self._ocorrencias[i], self.termos[i]))
+        else:
+            ids.sort(key=lambda i: (-self._ocorrencias[i], -len(self._linhas[i]), self.termos[i]))
+        return [self.termos[i] for i in ids]
+
+    def como_dict(self):
+        # Forma serializável em JSON; de_dict() reconstrói o índice.
+        return {
+            "termos": self.termos,
+            "ocorrencias": self._ocorrencias.tolist(),
+            "linhas": [linhas.tolist() for linhas in self._linhas],
+            "expansoes": {str(id_termo): dict(expansoes) for id_termo, expansoes in self._expansoes.items()},
+        }
+
+    @classmethod
+    def de_dict(cls, dados):
+        # Levanta ValueError se `dados` não vier de como_dict().
+        indice = cls()
+        try:
+            termos, ocorrencias, linhas, expansoes = dados["termos"], dados["ocorrencias"], dados["linhas"], dados["expansoes"]
+            if not (isinstance(termos, list) and set(map(type, termos)) <= {str} and len(set(termos)) == len(termos)
+                    and isinstance(linhas, list) and len(ocorrencias) == len(linhas) == len(termos)):
+                raise ValueError("termos, ocorrências e linhas não correspondem")
+            indice._ocorrencias = array("I", ocorrencias)
+            indice._linhas = [array("I", linhas_termo) for linhas_termo in linhas]
+            for id_termo, contagem in expansoes.items():
+                if not 0 <= int(id_termo) < len(termos) or not set(map(type, contagem)) <= {str}:
+                    raise ValueError("expansão inválida")
+                indice._expansoes[int(id_termo)] = Counter({expansao: int(n) for expansao, n in contagem.items()})
+        except (KeyError, TypeError, AttributeError, OverflowError) as erro:
+            raise ValueError(f"índice de termos inválido ({erro})") from None
+        indice.termos = termos
+        indice._ids = {termo: i for i, termo in enumerate(termos)}
+        return indice
+
+    def tabela(self, termos=None):
+        # Linhas prontas para exibição: termo, ocorrências, textos e a expansão mais frequente.
+        linhas = []
+        for termo in self.termos if termos is None else termos:
+            id_termo = self._ids[termo]
+            expansoes = self._expansoes.get(id_termo)
+            linhas.append({
+                "termo": termo,
+                "ocorrencias": self._ocorrencias[id_termo],
+                "textos": len(self._linhas[id_termo]),
+                "expansao": expansoes.most_common(1)[0][0] if expansoes else "",
+            })
+        return linhas
+
+
+def indexar_siglas(texto, indice=None):
+    # Uma varredura por linha: cada sigla é contada e, quando aparece entre parênteses,
+    # as palavras anteriores são usadas para detectar a sua expansão.
+    if indice is None:
+        indice = IndiceTermos()
+    for num_linha, linha in enumerate(texto.split("\n")):
+        for match in PADRAO_SIGLA.finditer(linha):
+            sigla = match.group()
+            id_termo = indice.adicionar(sigla, num_linha)
+            inicio, fim = match.span()
+            if inicio > 0 and linha[inicio - 1] == "(" and linha[fim:fim + 1] == ")":
+                expansao = expansao_da_sigla(sigla, linha, inicio - 1)
+                if expansao:
+                    indice.adicionar_expansao(id_termo, expansao)
+    return indice
@@ -0,0 +1,164 @@
+import csv
+import gzip
+import io
+import json
+import os
+from contextlib import contextmanager
+
+from iranotext.dicionarios import preparar_sigla
+
+FORMATOS = ("txt", "csv", "jsonl")
+COLUNA_ID = "ID Texto"
+LIMITE_CAMPO_CSV = 2**31 - 1
+EXTENSOES_PARQUET = (".parquet", ".pq")
+
+
+def nome_da_origem(origem):
+    return os.fspath(origem) if isinstance(origem, (str, os.PathLike)) else getattr(origem, "name", "")
+
+
+def detectar_formato(nome):
+    nome = nome.lower()
+    if nome.endswith(".gz"):
+        nome = nome[:-3]
+    extensao = os.path.splitext(nome)[1].lstrip(".")
+    if extensao == "ndjson":
+        return "jsonl"
+    return extensao if extensao in FORMATOS else "txt"
+
+
+@contextmanager
+def abrir_texto(origem, newline="\n"):
+    # Abre um caminho ou um arquivo binário já aberto (ex.: upload do Streamlit) como texto UTF-8,
+    # descomprimindo .gz em fluxo. Arquivos recebidos abertos não são fechados ao final.
+    # Por padrão só "\n" quebra linha, como no campo de texto do aplicativo (um "\r" isolado
+    # fica no texto); o módulo csv precisa de newline="" para tratar quebras dentro de aspas.
+    nome = nome_da_origem(origem)
+    comprimido = nome.lower().endswith(".gz")
+    if isinstance(origem, (str, os.PathLike)):
+        binario = gzip.open(origem, "rb") if comprimido else open(origem, "rb")
+        fluxo = io.TextIOWrapper(binario, encoding="utf-8-sig", newline=newline)
+        try:
+            yield fluxo
+        finally:
+            fluxo.close()
+        return
+
+    if hasattr(origem, "seek"):
+        origem.seek(0)
+    binario = gzip.GzipFile(fileobj=origem, mode="rb") if comprimido else origem
+    fluxo = io.TextIOWrapper(binario, encoding="utf-8-sig", newline=newline)
+    try:
+        yield fluxo
+    finally:
+        if comprimido:
+            fluxo.close()
+        else:
+            fluxo.detach()
+
+
+def _linhas(fluxo):
+    for linha in fluxo:
+        yield linha.rstrip("\r\n")
+
+
+def _objetos_jsonl(fluxo, nome, coluna_texto):
+    # Números no campo de texto viram texto; listas, objetos e booleanos são erro de formato.
+    for num_linha, linha in enumerate(_linhas(fluxo), start=1):
+        if not linha.strip():
+            continue
+        try:
+            registro = json.loads(linha)
+        except json.JSONDecodeError as erro:
+            raise ValueError(f"{nome}: linha {num_linha}: JSON inválido ({erro.msg})") from None
+        if not isinstance(registro, dict):
+            raise ValueError(f"{nome}: linha {num_linha}: esperado um objeto JSON, encontrado {type(registro).__name__}")
+        texto = registro.get(coluna_texto)
+        if isinstance(texto, (int, float)) and not isinstance(texto, bool):
+            registro[coluna_texto] = str(texto)
+        elif texto is not None and not isinstance(texto, str):
+            raise ValueError(f"{nome}: linha {num_linha}: campo '{coluna_texto}' deve ser texto, encontrado {type(texto).__name__}")
+        yield registro
+
+
+def ler_textos(origem, formato=None, coluna_texto="texto", coluna_id="id"):
+    # Gera {"id", "texto"} sem carregar o arquivo inteiro.
+    # TXT: um texto por linha, identificados como texto_1, texto_2, ... (linhas em branco no
+    # início são ignoradas, como no campo de texto do aplicativo).
+    # CSV e JSONL: campos `coluna_texto` e, se existir, `coluna_id`.
+    nome = nome_da_origem(origem)
+    formato = formato or detectar_formato(nome)
+    with abrir_texto(origem, newline="" if formato == "csv" else "\n") as fluxo:
+        if formato == "txt":
+            numero = 0
+            for linha in _linhas(fluxo):
+                if numero or linha.strip():
+                    numero += 1
+                    yield {"id": f"texto_{numero}", "texto": linha}
+            return
+
+        if formato == "csv":
+            csv.field_size_limit(LIMITE_CAMPO_CSV)
+            registros = csv.DictReader(fluxo)
+            colunas = registros.fieldnames or []
+            if coluna_texto not in colunas:
+                disponiveis = ", ".join(f"'{coluna}'" for coluna in colunas) or "nenhuma"
+                raise ValueError(f"{nome}: coluna '{coluna_texto}' não encontrada (colunas disponíveis: {disponiveis})")
+        else:
+            registros = _objetos_jsonl(fluxo, nome, coluna_texto)
+        for i, registro in enumerate(registros, start=1):
+            id_val = registro.get(coluna_id) or f"texto_{i}"
+            yield {"id": str(id_val), "texto": registro.get(coluna_texto) or ""}
+
+
+def ler_entidades(origem):
+    # Uma entidade por linha (TXT) ou na primeira coluna (CSV); uma segunda coluna, se houver,
+    # traz a forma normalizada.
+    entidades = []
+    eh_csv = detectar_formato(nome_da_origem(origem)) == "csv"
+    with abrir_texto(origem, newline="" if eh_csv else "\n") as fluxo:
+        linhas = csv.reader(fluxo) if eh_csv else ([linha] for linha in _linhas(fluxo))
+        for i, linha in enumerate(linhas):
+            entidade = linha[0].strip() if linha else ""
+            if not entidade or (i == 0 and entidade.lower() in ("entidade", "entidades nomeadas")):
+                continue
+            forma_normalizada = linha[1].strip() if len(linha) > 1 and linha[1].strip() else entidade.replace(" ", "_")
+            entidades.append({"Entidades nomeadas": entidade, "Palavra normalizada": forma_normalizada})
+    return entidades
+
+
+def ler_siglas(origem):
+    # Duas colunas: sigla e significado. Um cabeçalho "Sigla,Significado" é ignorado.
+    siglas = []
+    with abrir_texto(origem, newline="") as fluxo:
+        for i, linha in enumerate(csv.reader(fluxo)):
+            if len(linha) < 2 or (i == 0 and linha[0].strip().lower() == "sigla"):
+                continue
+            sigla, significado = linha[0].strip(), linha[1].strip()
+            if sigla and significado:
+                siglas.append(preparar_sigla(sigla, significado))
+    return siglas
+
+
+def ler_metadados(origem, coluna_id=COLUNA_ID):
+    # CSV (também .gz) ou Parquet com uma linha por texto: a coluna "ID Texto" e uma coluna por
+    # variável. Devolve um DataFrame com todos os valores como texto ("" onde não há valor),
+    # pronto para cabecalhos_metadados. O pandas só é importado aqui.
+    import pandas as pd
+
+    nome = nome_da_origem(origem)
+    if nome.lower().endswith(EXTENSOES_PARQUET):
+        if hasattr(origem, "seek"):
+            origem.seek(0)
+        # Tipos anuláveis: uma coluna de inteiros com valores ausentes continua inteira ("2020",
+        # não "2020.0").
+        tabela = pd.read_parquet(origem, dtype_backend="numpy_nullable")
+    else:
+        with abrir_texto(origem, newline="") as fluxo:
+            tabela = pd.read_csv(fluxo, dtype=str, keep_default_na=False)
+    tabela.columns = [str(coluna).strip() for coluna in tabela.columns]
+    if coluna_id not in tabela.columns:
+        raise ValueError(f"{nome}: coluna '{coluna_id}' não encontrada")
+    tabela = tabela.astype("string").fillna("").astype(object).rename(columns={coluna_id: COLUNA_ID})
+    tabela[COLUNA_ID] = tabela[COLUNA_ID].str.strip()
+    return tabela
@@ -0,0 +1,171 @@
+import cProfile
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger("iranotext.desempenho")
+
+
+def ativar_log_json(stream=None):
+    # Envia as medições (uma linha JSON por etapa) para `stream`, padrão saída de erro. Idempotente.
+    if not any(getattr(handler, "_iranotext", False) for handler in logger.handlers):
+        handler = logging.StreamHandler(stream)
+        handler._iranotext = True
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+# tracemalloc é global no processo: fica ligado enquanto alguma etapa com memória estiver aberta.
+_trava_memoria = threading.Lock()
+_etapas_com_memoria = 0
+_tracemalloc_ligado_aqui = False
+
+
+def _ligar_tracemalloc():
+    global _etapas_com_memoria, _tracemalloc_ligado_aqui
+    with _trava_memoria:
+        if not _etapas_com_memoria:
+            _tracemalloc_ligado_aqui = not tracemalloc.is_tracing()
+            if _tracemalloc_ligado_aqui:
+                tracemalloc.start()
+        _etapas_com_memoria += 1
+
+
+def _desligar_tracemalloc():
+    global _etapas_com_memoria
+    with _trava_memoria:
+        _etapas_com_memoria -= 1
+        if not _etapas_com_memoria and _tracemalloc_ligado_aqui:
+            tracemalloc.stop()
+
+
+def medir_opcional(instrumentacao, etapa, **kwargs):
+    # instrumentacao.medir(), ou um contexto que não mede nada quando não há instrumentação.
+    return instrumentacao.medir(etapa, **kwargs) if instrumentacao is not None else nullcontext()
+
+
+def tamanho_utf8(texto):
+    return len(texto.encode("utf-8", "surrogatepass"))
+
+
+class MedicaoEtapa:
+    def __init__(self, nome):
+        self.nome = nome
+        self.segundos = 0.0
+        self.textos = 0
+        self.bytes_entrada = 0
+        self.bytes_saida = 0
+        self.pico_memoria_mb = None
+        self.emitida = False
+
+    @property
+    def textos_por_segundo(self):
+        return self.textos / self.segundos if self.segundos and self.textos else None
+
+    def como_dict(self):
+        return {
+            "etapa": self.nome,
+            "segundos": round(self.segundos, 6),
+            "textos": self.textos,
+            "textos_por_segundo": round(self.textos_por_segundo, 1) if self.textos_por_segundo else None,
+            "bytes_entrada": self.bytes_entrada,
+            "bytes_saida": self.bytes_saida,
+            "pico_memoria_mb": round(self.pico_memoria_mb, 1) if self.pico_memoria_mb is not None else None,
+        }
+
+
+class Instrumentacao:
+    # Acumula, por etapa, tempo, textos e bytes de entrada e saída. Só existe quando pedida: sem
+    # ela, o pipeline não faz nenhuma medição. Ao fim de cada etapa medida com medir(), e em
+    # registrar(), as medições são emitidas em JSON pelo logger "iranotext.desempenho". Com
+    # `perfil`, perfilar() grava um dump do cProfile nesse arquivo. Com `memoria`, cada etapa de
+    # medir() registra também o pico de memória alocada acima da que havia no seu início
+    # (tracemalloc, que deixa o processamento bem mais lento; com tarefas simultâneas, as
+    # alocações de umas entram nas medições das outras).
+    def __init__(self, perfil=None, memoria=False):
+        self.etapas = {}
+        self.perfil = perfil
+        self.memoria = memoria
+        # Etapas abertas, da mais externa à mais interna, com a memória no início de cada uma e
+        # o maior pico visto até agora.
+        self._abertas = []
+
+    def etapa(self, nome):
+        medicao = self.etapas.get(nome)
+        if medicao is None:
+            medicao = self.etapas[nome] = MedicaoEtapa(nome)
+        return medicao
+
+    def acumular(self, nome, segundos, textos=0, bytes_entrada=0, bytes_saida=0):
+        # Para etapas executadas texto a texto dentro de um laço.
+        medicao = self.etapa(nome)
+        medicao.segundos += segundos
+        medicao.textos += textos
+        medicao.bytes_entrada += bytes_entrada
+        medicao.bytes_saida += bytes_saida
+
+    def _atualizar_picos(self):
+        # Passa o pico desde o último reset às etapas abertas, antes de um novo reset.
+        pico = tracemalloc.get_traced_memory()[1]
+        for aberta in self._abertas:
+            aberta[2] = max(aberta[2], pico)
+
+    @contextmanager
+    def medir(self, nome, textos=0, bytes_entrada=0):
+        medicao = self.etapa(nome)
+        medicao.textos += textos
+        medicao.bytes_entrada += bytes_entrada
+        if self.memoria:
+            _ligar_tracemalloc()
+            self._atualizar_picos()
+            tracemalloc.reset_peak()
+            atual = tracemalloc.get_traced_memory()[0]
+            self._abertas.append([medicao, atual, atual])
+        inicio = time.perf_counter()
+        try:
+            yield medicao
+        finally:
+            medicao.segundos += time.perf_counter() - inicio
+            if self.memoria:
+                self._atualizar_picos()
+                _, no_inicio, pico = self._abertas.pop()
+                _desligar_tracemalloc()
+                medicao.pico_memoria_mb = max(medicao.pico_memoria_mb or 0.0, (pico - no_inicio) / (1024 * 1024))
+            medicao.emitida = True
+            self.emitir(medicao)
+
+    @contextmanager
+    def perfilar(self):
+        if not self.perfil:
+            yield
+            return
+        perfilador = cProfile.Profile()
+        perfilador.enable()
+        try:
+            yield
+        finally:
+            perfilador.disable()
+            perfilador.dump_stats(self.perfil)
+            logger.info(json.dumps({"perfil": self.perfil}))
+
+    def emitir(self, medicao):
+        logger.info(json.dumps(medicao.como_dict(), ensure_ascii=False))
+
+    def registrar(self):
+        # Emite as etapas acumuladas com acumular(); as de medir() já foram emitidas.
+        for medicao in self.etapas.values():
+            if not medicao.emitida:
+                medicao.emitida = True
+                self.emitir(medicao)
+
+    def incorporar(self, etapas):
+        # Medições feitas em outro processo (ex.: o NER das tarefas do aplicativo), emitidas ao chegar.
+        for medicao in etapas.values():
+            self.etapas[medicao.nome] = medicao
+            self.emitir(medicao)
+
+    def tabela(self):
+        return [medicao.como_dict() for medicao in self.etapas.values()]
@@ -0,0 +1,145 @@
+import re
+from functools import lru_cache
+
+from iranotext.dicionarios import padrao_trie
+
+NUMEROS_POR_EXTENSO = {
+    "zero": "0", "dois": "2", "duas": "2",
+    "três": "3", "quatro": "4", "cinco": "5", "seis": "6",
+    "sete": "7", "oito": "8", "nove": "9", "dez": "10",
+    "onze": "11", "doze": "12", "treze": "13", "quatorze": "14",
+    "quinze": "15", "dezesseis": "16", "dezessete": "17",
+    "dezoito": "18", "dezenove": "19", "vinte": "20",
+    "trinta": "30", "quarenta": "40", "cinquenta": "50",
+    "sessenta": "60", "setenta": "70", "oitenta": "80",
+    "noventa": "90", "cem": "100", "cento": "100",
+    "duzentos": "200", "trezentos": "300", "quatrocentos": "400",
+    "quinhentos": "500", "seiscentos": "600", "setecentos": "700",
+    "oitocentos": "800", "novecentos": "900", "mil": "1000"
+}
+
+TAMANHO_CACHE_TRECHOS = 65536
+
+# Trecho máximo formado por letras/dígitos e hífens que contém ao menos um hífen.
+# Todas as etapas de pronomes só casam dentro de um trecho desses.
+PADRAO_TRECHO_HIFENIZADO = r"(?<![\w-])\w*-[\w-]*"
+
+
+class Etapa:
+    # Uma etapa de normalização: uma substituição por expressão regular.
+    # Etapas de "palavra" trocam palavras inteiras por um valor de um mapa;
+    # as demais só casam dentro de trechos hifenizados (ex.: "dá-lo-ia").
+    def __init__(self, nome, padrao, substituicao, mapa=None, ativa=True):
+        self.nome = nome
+        self.padrao = padrao
+        self.substituicao = substituicao
+        self.mapa = mapa
+        self.ativa = ativa
+
+    def aplicar(self, texto):
+        return self.padrao.sub(self.substituicao, texto)
+
+    def __repr__(self):
+        return f"Etapa({self.nome!r}, ativa={self.ativa})"
+
+
+def etapa_palavras(nome, mapa):
+    padrao = re.compile(r"\b(" + padrao_trie(mapa) + r")\b", re.IGNORECASE)
+    return Etapa(nome, padrao, lambda match: mapa[match.group(1).lower()], mapa=mapa)
+
+
+def etapas_padrao():
+    return [
+        etapa_palavras("numeros_por_extenso", NUMEROS_POR_EXTENSO),
+        Etapa("palavras_com_se", re.compile(r"(\b\w+)-se\b"), r"se \1"),
+        Etapa("pronome_se", re.compile(r"\b(\w+)-se\b"), r"se \1"),
+        Etapa("pronomes_o_a", re.compile(r"\b(\w+)-([oa]s?)\b"), r"\2 \1"),
+        Etapa("pronomes_lhe", re.compile(r"\b(\w+)-(lhe|lhes)\b"), r"\2 \1"),
+        Etapa("pronomes_me_te_nos_vos", re.compile(r"\b(\w+)-(me|te|nos|vos)\b"), r"\2 \1"),
+        Etapa("pronomes_o_a_acentuados", re.compile(r"\b(\w+)[áéíóúâêô]?-([oa]s?)\b"), r"\2 \1"),
+        Etapa("mesoclise", re.compile(r"\b(\w+)[áéíóúâêô]-(lo|la|los|las)-ia\b"), r"\2 \1ia"),
+    ]
+
+
+class PipelineNormalizacao:
+    # Aplica as etapas em uma única varredura do texto. Cada trecho hifenizado recebe
+    # todas as etapas em sequência (com cache, pois os trechos se repetem muito);
+    # fora deles só as etapas de palavra podem casar, e o mapa é consultado direto.
+    # O resultado é idêntico a aplicar as etapas uma a uma sobre o texto inteiro.
+    def __init__(self, etapas=None):
+        self.etapas = etapas_padrao() if etapas is None else list(etapas)
+        self.compilar()
+
+    @property
+    def nomes(self):
+        return [etapa.nome for etapa in self.etapas if etapa.ativa]
+
+    def ativar(self, nome, ativa=True):
+        for etapa in self.etapas:
+            if etapa.nome == nome:
+                etapa.ativa = ativa
+                self.compilar()
+                return
+        raise KeyError(nome)
+
+    def compilar(self):
+        ativas = [etapa for etapa in self.etapas if etapa.ativa]
+        self._mapas = [etapa.mapa for etapa in ativas if etapa.mapa is not None]
+        ha_hifenizadas = len(self._mapas) < len(ativas)
+
+        alternativas = []
+        if ha_hifenizadas:
+            alternativas.append(rf"(?P<trecho>{PADRAO_TRECHO_HIFENIZADO})")
+        if self._mapas:
+            palavras = [palavra for mapa in self._mapas for palavra in mapa]
+            alternativas.append(r"\b(?P<palavra>" + padrao_trie(palavras) + r")\b")
+        self._padrao = re.compile("|".join(alternativas), re.IGNORECASE) if alternativas else None
+
+        def normalizar_trecho(trecho):
+            for etapa in ativas:
+                trecho = etapa.aplicar(trecho)
+            return trecho
+
+        self._normalizar_trecho = lru_cache(maxsize=TAMANHO_CACHE_TRECHOS)(normalizar_trecho)
+
+    def _substituir(self, match):
+        if match.lastgroup == "trecho":
+            return self._normalizar_trecho(match.group("trecho"))
+        palavra = match.group("palavra")
+        for mapa in self._mapas:
+            palavra = mapa.get(palavra.lower(), palavra)
+        return palavra
+
+    def __call__(self, texto):
+        if not isinstance(texto, str) or self._padrao is None:
+            return texto
+        return self._padrao.sub(self._substituir, texto)
+
+
+PIPELINE_PADRAO = PipelineNormalizacao()
+_ETAPAS = {etapa.nome: etapa for etapa in etapas_padrao()}
+
+
+def normalizar_texto(texto):
+    return PIPELINE_PADRAO(texto)
+
+
+def converter_numeros_por_extenso(texto):
+    if not isinstance(texto, str):
+        return texto
+    return _ETAPAS["numeros_por_extenso"].aplicar(texto)
+
+
+def processar_palavras_com_se(texto):
+    if not isinstance(texto, str):
+        return texto
+    return _ETAPAS["palavras_com_se"].aplicar(texto)
+
+
+def processar_pronomes_pospostos(texto):
+    if not isinstance(texto, str):
+        return texto
+    for nome in ("pronome_se", "pronomes_o_a", "pronomes_lhe", "pronomes_me_te_nos_vos",
+                 "pronomes_o_a_acentuados", "mesoclise"):
+        texto = _ETAPAS[nome].aplicar(texto)
+    return texto
@@ -0,0 +1,168 @@
+import csv
+import datetime
+import io
+import json
+import os
+import re
+import tempfile
+from itertools import chain
+
+from iranotext.dicionarios import SubstituidorDicionario, dicionario_entidades, dicionario_siglas, padrao_trie
+
+FORMATO_DICIONARIO = 1
+EXTENSAO_DICIONARIO = ".iradic"
+TIPOS_DICIONARIO = ("siglas", "entidades")
+DIRETORIO_PADRAO = os.environ.get("IRANOTEXT_DICIONARIOS") or os.path.join(os.path.expanduser("~"), ".iranotext", "dicionarios")
+
+# Colunas de cada tipo de dicionário, no formato usado por preparar_sigla/preparar_entidades.
+COLUNAS_DICIONARIO = {
+    "siglas": ("Sigla", "Significado"),
+    "entidades": ("Entidades nomeadas", "Palavra normalizada"),
+}
+
+
+def exportar_csv(tipo, registros):
+    # No mesmo formato aceito por ler_siglas/ler_entidades.
+    saida = io.StringIO()
+    escritor = csv.writer(saida)
+    colunas = COLUNAS_DICIONARIO[tipo]
+    escritor.writerow(["sigla", "significado"] if tipo == "siglas" else ["entidade", "forma normalizada"])
+    for registro in registros:
+        valor = registro[colunas[1]]
+        escritor.writerow([registro[colunas[0]], valor.replace("_", " ") if tipo == "siglas" else valor])
+    return saida.getvalue()
+
+
+class DicionarioSalvo:
+    # Um dicionário pronto para uso: as entradas como foram informadas, as chaves já
+    # normalizadas (termo -> substituto) e o padrão em trie já montado. Só a compilação da
+    # expressão regular fica para o uso, e ela é reaproveitada dentro do mesmo processo.
+    def __init__(self, tipo, registros, nome="", versao=0, criado=None, dicionario=None, trie=None):
+        if tipo not in TIPOS_DICIONARIO:
+            raise ValueError(f"tipo de dicionário desconhecido: {tipo}")
+        self.tipo = tipo
+        self.registros = registros
+        self.nome = nome
+        self.versao = versao
+        self.criado = criado
+        if dicionario is None:
+            dicionario = dicionario_siglas(registros) if tipo == "siglas" else dicionario_entidades(registros)
+            dicionario = {termo: valor for termo, valor in dicionario.items() if termo}
+        self.dicionario = dicionario
+        self.trie = trie if trie is not None else padrao_trie(dicionario)
+
+    def __len__(self):
+        return len(self.registros)
+
+    def substituidor(self):
+        return SubstituidorDicionario(self.dicionario, remover_parenteses=self.tipo == "siglas", trie=self.trie)
+
+    def exportar_csv(self):
+        return exportar_csv(self.tipo, self.registros)
+
+    def salvar(self, caminho):
+        # JSON em UTF-8, com o número do formato para que versões futuras o reconheçam.
+        colunas = COLUNAS_DICIONARIO[self.tipo]
+        dados = {
+            "formato": FORMATO_DICIONARIO,
+            "tipo": self.tipo,
+            "nome": self.nome,
+            "versao": self.versao,
+            "criado": self.criado,
+            "registros": [[registro[coluna] for coluna in colunas] for registro in self.registros],
+            "dicionario": self.dicionario,
+            "trie": self.trie,
+        }
+        conteudo = json.dumps(dados, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(caminho)), prefix=".iranotext_dic_")
+        try:
+            with os.fdopen(descritor, "wb") as arquivo:
+                arquivo.write(conteudo)
+            os.replace(temporario, caminho)
+        except BaseException:
+            os.unlink(temporario)
+            raise
+
+    @classmethod
+    def carregar(cls, caminho):
+        try:
+            with open(caminho, "rb") as arquivo:
+                dados = json.load(arquivo)
+        except (UnicodeDecodeError, json.JSONDecodeError) as erro:
+            raise ValueError(f"{caminho}: não é um dicionário salvo ({erro})") from None
+        if not isinstance(dados, dict) or dados.get("formato") != FORMATO_DICIONARIO:
+            formato = dados.get("formato") if isinstance(dados, dict) else None
+            raise ValueError(f"{caminho}: formato de dicionário não suportado ({formato})")
+        tipo = dados.get("tipo")
+        if tipo not in TIPOS_DICIONARIO:
+            raise ValueError(f"{caminho}: tipo de dicionário desconhecido: {tipo}")
+        colunas = COLUNAS_DICIONARIO[tipo]
+        registros, dicionario = dados.get("registros"), dados.get("dicionario")
+        valido = (isinstance(dados.get("nome"), str) and isinstance(dados.get("versao"), int)
+                  and isinstance(dados.get("criado"), (str, type(None))) and isinstance(dados.get("trie"), str)
+                  and isinstance(registros, list) and isinstance(dicionario, dict)
+                  and set(map(type, registros)) <= {list} and set(map(len, registros)) <= {len(colunas)}
+                  and set(map(type, chain.from_iterable(registros))) <= {str}
+                  and set(map(type, dicionario.values())) <= {str})
+        if not valido:
+            raise ValueError(f"{caminho}: dicionário salvo corrompido")
+        registros = [dict(zip(colunas, valores)) for valores in registros]
+        return cls(tipo, registros, dados["nome"], dados["versao"], dados["criado"], dicionario, dados["trie"])
+
+
+def nome_seguro(nome):
+    nome = re.sub(r"[^\w-]+", "_", nome.strip()).strip("_")
+    if not nome:
+        raise ValueError("nome de dicionário vazio")
+    return nome
+
+
+class RepositorioDicionarios:
+    # Dicionários salvos em disco, um arquivo por versão: <diretorio>/<tipo>/<nome>.v0001.iradic.
+    # Salvar um dicionário igual à última versão não cria uma versão nova.
+    def __init__(self, diretorio=DIRETORIO_PADRAO):
+        self.diretorio = diretorio
+
+    def _pasta(self, tipo):
+        if tipo not in TIPOS_DICIONARIO:
+            raise ValueError(f"tipo de dicionário desconhecido: {tipo}")
+        return os.path.join(self.diretorio, tipo)
+
+    def caminho(self, tipo, nome, versao):
+        return os.path.join(self._pasta(tipo), f"{nome_seguro(nome)}.v{versao:04d}{EXTENSAO_DICIONARIO}")
+
+    def _arquivos(self, tipo):
+        pasta = self._pasta(tipo)
+        if not os.path.isdir(pasta):
+            return []
+        padrao = re.compile(rf"(.+)\.v(\d+){re.escape(EXTENSAO_DICIONARIO)}$")
+        return [(m.group(1), int(m.group(2))) for m in map(padrao.match, os.listdir(pasta)) if m]
+
+    def nomes(self, tipo):
+        return sorted({nome for nome, _ in self._arquivos(tipo)})
+
+    def versoes(self, tipo, nome):
+        nome = nome_seguro(nome)
+        return sorted(versao for outro, versao in self._arquivos(tipo) if outro == nome)
+
+    def carregar(self, tipo, nome, versao=None):
+        # Sem `versao`, carrega a mais recente.
+        if versao is None:
+            versoes = self.versoes(tipo, nome)
+            if not versoes:
+                raise FileNotFoundError(f"dicionário de {tipo} não encontrado: {nome}")
+            versao = versoes[-1]
+        return DicionarioSalvo.carregar(self.caminho(tipo, nome, versao))
+
+    def salvar(self, tipo, nome, registros):
+        nome = nome_seguro(nome)
+        versoes = self.versoes(tipo, nome)
+        if versoes:
+            atual = self.carregar(tipo, nome, versoes[-1])
+            if atual.registros == list(registros):
+                return atual
+        os.makedirs(self._pasta(tipo), exist_ok=True)
+        versao = versoes[-1] + 1 if versoes else 1
+        dicionario = DicionarioSalvo(tipo, list(registros), nome, versao, datetime.datetime.now().isoformat(timespec="seconds"))
+        dicionario.salvar(self.caminho(tipo, nome, versao))
+        return dicionario
@@ -0,0 +1,28 @@
+import re
+from collections import Counter
+
+CARACTERES_ESPECIAIS = {
+    "-": "Hífen", ";": "Ponto e vírgula", '"': "Aspas duplas", "'": "Aspas simples", "…": "Reticências", "–": "Travessão", "(": "Parêntese esquerdo", ")": "Parêntese direito", "/": "Barra", "%": "Porcentagem", "[": "Colchete esquerdo", "]": "Colchete direito", "{": "Chave esquerda", "}": "Chave direita", "&": "E comercial", "*": "Asterisco", "@": "Arroba", "#": "Cerquilha", "$": "Cifrão", "+": "Mais", "=": "Igual", "<": "Menor que", ">": "Maior que", "\\": "Barra invertida", "|": "Barra vertical", "~": "Til", "`": "Acento grave", "^": "Circunflexo"
+}
+
+# Aspas são apagadas, "%" vira "_por_cento" e os demais caracteres viram "_".
+SUBSTITUICOES_CARACTERES = {
+    char: "" if char in ('"', "'") else "_por_cento" if char == "%" else "_"
+    for char in CARACTERES_ESPECIAIS
+}
+PADRAO_CARACTERES = re.compile("[" + re.escape("".join(CARACTERES_ESPECIAIS)) + "]")
+
+
+def sanitizar_texto(texto, contagem_caracteres=None):
+    # Remove os caracteres incompatíveis com o IRaMuTeQ e colapsa os espaços.
+    # Uma única varredura encontra e conta os caracteres presentes (em geral poucos ou nenhum);
+    # só eles são substituídos. Se contagem_caracteres (um Counter) for informado, as
+    # ocorrências de cada caractere são somadas nele.
+    encontrados = PADRAO_CARACTERES.findall(texto)
+    if encontrados:
+        presentes = Counter(encontrados)
+        if contagem_caracteres is not None:
+            contagem_caracteres.update(presentes)
+        for char in presentes:
+            texto = texto.replace(char, SUBSTITUICOES_CARACTERES[char])
+    return " ".join(texto.split())
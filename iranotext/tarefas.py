@@ -0,0 +1,402 @@
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext, suppress
+
+from iranotext.analise import TAMANHO_LOTE_NER, indexar_entidades
+from iranotext.corpus import EstatisticasCorpus, _contexto_processos, escrever_corpus, gerar_corpus
+from iranotext.indice import IndiceTermos, indexar_siglas
+from iranotext.ingestao import ler_textos
+from iranotext.instrumentacao import Instrumentacao, medir_opcional
+
+logger = logging.getLogger(__name__)
+
+DIRETORIO_TAREFAS = os.environ.get("IRANOTEXT_TAREFAS") or os.path.join(tempfile.gettempdir(), "iranotext_tarefas")
+# Tarefas executadas ao mesmo tempo no servidor, somadas as de todos os usuários; as demais
+# esperam na fila, que também tem limite.
+MAX_TAREFAS_SIMULTANEAS = int(os.environ.get("IRANOTEXT_TAREFAS_SIMULTANEAS") or max(1, (os.cpu_count() or 1) // 2))
+MAX_TAREFAS_NA_FILA = 8
+MAX_TAREFAS_POR_USUARIO = 1
+INTERVALO_GRAVACAO = 1.0
+IDADE_MAXIMA_TAREFAS = 24 * 60 * 60
+FORMATO_ANALISE = 1
+
+NA_FILA = "na_fila"
+EXECUTANDO = "executando"
+CONCLUIDA = "concluida"
+CANCELADA = "cancelada"
+ERRO = "erro"
+# Estava ativa quando o processo que a executava terminou.
+INTERROMPIDA = "interrompida"
+SITUACOES_ATIVAS = (NA_FILA, EXECUTANDO)
+
+ARQUIVO_ESTADO = "estado.json"
+ARQUIVO_CORPUS = "corpus.txt"
+ARQUIVO_PREVIA = "previa.txt"
+ARQUIVO_ANALISE = "analise.json"
+ARQUIVO_PERFIL = "perfil.pstats"
+
+
+class TarefaCancelada(Exception):
+    pass
+
+
+class LimiteTarefas(RuntimeError):
+    pass
+
+
+def _gravar_atomico(caminho, dados):
+    descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), prefix=".iranotext_tarefa_")
+    try:
+        with os.fdopen(descritor, "wb") as arquivo:
+            arquivo.write(dados)
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+
+
+class Tarefa:
+    # Uma execução em segundo plano. O estado (situação, progresso e um resumo do resultado) é
+    # gravado em <diretorio>/estado.json junto com os arquivos de resultado, para que uma sessão
+    # que se reconecte, ou outro processo, encontre a tarefa terminada.
+    def __init__(self, id, tipo, diretorio, usuario=None, total=None):
+        self.id = id
+        self.tipo = tipo
+        self.diretorio = diretorio
+        self.usuario = usuario
+        self.total = total
+        self.processados = 0
+        self.situacao = NA_FILA
+        self.criada = time.time()
+        self.inicio = None
+        self.fim = None
+        self.erro = None
+        self.resultado = {}
+        # Só em memória: o que não cabe no estado gravado (ex.: medições de desempenho).
+        self.extras = {}
+        self.futuro = None
+        self._cancelamento = threading.Event()
+        self._gravada = 0.0
+
+    def caminho(self, nome):
+        return os.path.join(self.diretorio, nome)
+
+    @property
+    def ativa(self):
+        return self.situacao in SITUACOES_ATIVAS
+
+    @property
+    def cancelamento_pedido(self):
+        return self._cancelamento.is_set()
+
+    @property
+    def segundos(self):
+        if self.inicio is None:
+            return 0.0
+        return (self.fim or time.time()) - self.inicio
+
+    @property
+    def segundos_restantes(self):
+        # Estimativa pelo ritmo até agora; None sem total conhecido ou antes do primeiro texto.
+        if self.situacao != EXECUTANDO or not self.total or not self.processados:
+            return None
+        return self.segundos / self.processados * max(self.total - self.processados, 0)
+
+    def avancar(self, processados=None):
+        # Chamado pelo trabalho a cada texto; é onde o cancelamento é atendido.
+        if self._cancelamento.is_set():
+            raise TarefaCancelada(self.id)
+        self.processados = self.processados + 1 if processados is None else processados
+        if time.monotonic() - self._gravada >= INTERVALO_GRAVACAO:
+            self.gravar()
+
+    def cancelar(self):
+        self._cancelamento.set()
+        if self.futuro is not None and self.futuro.cancel():
+            self.situacao = CANCELADA
+            self.fim = time.time()
+            self.gravar()
+
+    def como_dict(self):
+        return {
+            "id": self.id,
+            "tipo": self.tipo,
+            "usuario": self.usuario,
+            "situacao": self.situacao,
+            "total": self.total,
+            "processados": self.processados,
+            "criada": self.criada,
+            "inicio": self.inicio,
+            "fim": self.fim,
+            "erro": self.erro,
+            "resultado": self.resultado,
+        }
+
+    def gravar(self):
+        self._gravada = time.monotonic()
+        _gravar_atomico(self.caminho(ARQUIVO_ESTADO), json.dumps(self.como_dict(), ensure_ascii=False).encode("utf-8"))
+
+    @classmethod
+    def carregar(cls, diretorio):
+        with open(os.path.join(diretorio, ARQUIVO_ESTADO), encoding="utf-8") as arquivo:
+            dados = json.load(arquivo)
+        tarefa = cls(dados["id"], dados["tipo"], diretorio, dados["usuario"], dados["total"])
+        for campo in ("processados", "situacao", "criada", "inicio", "fim", "erro", "resultado"):
+            setattr(tarefa, campo, dados[campo])
+        if tarefa.ativa:
+            # Lida do disco, a tarefa não está em execução neste processo.
+            tarefa.situacao = INTERROMPIDA
+        return tarefa
+
+
+class ExecutorTarefas:
+    # Fila de tarefas em segundo plano, compartilhada por todas as sessões de um servidor. No
+    # máximo `max_simultaneas` tarefas executam ao mesmo tempo; submeter() recusa novas tarefas
+    # com LimiteTarefas quando a fila está cheia ou o usuário já tem tarefas ativas demais.
+    def __init__(self, diretorio=DIRETORIO_TAREFAS, max_simultaneas=MAX_TAREFAS_SIMULTANEAS,
+                 max_na_fila=MAX_TAREFAS_NA_FILA, max_por_usuario=MAX_TAREFAS_POR_USUARIO):
+        self.diretorio = diretorio
+        self.max_simultaneas = max_simultaneas
+        self.max_na_fila = max_na_fila
+        self.max_por_usuario = max_por_usuario
+        self._executor = ThreadPoolExecutor(max_workers=max_simultaneas, thread_name_prefix="iranotext_tarefa")
+        self._tarefas = {}
+        self._trava = threading.Lock()
+
+    def processos_por_tarefa(self, pedidos):
+        # Processos que uma nova tarefa pode usar, dividindo as CPUs entre ela e as tarefas que
+        # estão em execução agora (e não pelo número de vagas, que pode estar quase todo livre).
+        em_execucao = sum(tarefa.situacao == EXECUTANDO for tarefa in list(self._tarefas.values()))
+        return max(1, min(pedidos, (os.cpu_count() or 1) // (em_execucao + 1)))
+
+    def submeter(self, tipo, trabalho, *args, usuario=None, total=None, arquivos=None, **kwargs):
+        # `trabalho(tarefa, *args, **kwargs)` deve chamar tarefa.avancar() a cada texto e gravar
+        # seus resultados em tarefa.diretorio. `arquivos` ({nome: arquivo binário aberto}) são
+        # copiados para tarefa.diretorio antes de a tarefa entrar na fila.
+        with self._trava:
+            ativas = [tarefa for tarefa in self._tarefas.values() if tarefa.ativa]
+            if usuario is not None and sum(tarefa.usuario == usuario for tarefa in ativas) >= self.max_por_usuario:
+                raise LimiteTarefas("já existe uma tarefa em andamento para este usuário")
+            if len(ativas) >= self.max_simultaneas + self.max_na_fila:
+                raise LimiteTarefas("o servidor está ocupado; tente novamente em alguns minutos")
+            self._limpar()
+            id = uuid.uuid4().hex
+            tarefa = Tarefa(id, tipo, os.path.join(self.diretorio, id), usuario, total)
+            os.makedirs(tarefa.diretorio)
+            # A vaga fica reservada enquanto os arquivos são copiados, fora da trava.
+            self._tarefas[id] = tarefa
+        try:
+            for nome, origem in (arquivos or {}).items():
+                origem.seek(0)
+                with open(tarefa.caminho(nome), "wb") as destino:
+                    shutil.copyfileobj(origem, destino)
+            tarefa.gravar()
+        except BaseException:
+            with self._trava:
+                self._tarefas.pop(id, None)
+            shutil.rmtree(tarefa.diretorio, ignore_errors=True)
+            raise
+        tarefa.futuro = self._executor.submit(self._executar, tarefa, trabalho, args, kwargs)
+        return tarefa
+
+    def _executar(self, tarefa, trabalho, args, kwargs):
+        if tarefa.cancelamento_pedido:
+            tarefa.situacao = CANCELADA
+            tarefa.fim = time.time()
+            tarefa.gravar()
+            return
+        tarefa.situacao = EXECUTANDO
+        tarefa.inicio = time.time()
+        tarefa.gravar()
+        try:
+            trabalho(tarefa, *args, **kwargs)
+            tarefa.situacao = CONCLUIDA
+        except TarefaCancelada:
+            tarefa.situacao = CANCELADA
+        except Exception as erro:
+            logger.exception("Tarefa %s (%s) falhou", tarefa.id, tarefa.tipo)
+            tarefa.situacao = ERRO
+            tarefa.erro = str(erro) or type(erro).__name__
+        finally:
+            tarefa.fim = time.time()
+            tarefa.gravar()
+
+    def tarefa(self, id):
+        # A tarefa em memória ou, se este processo não a conhece (ex.: servidor reiniciado), a
+        # gravada em disco. None se não existir.
+        tarefa = self._tarefas.get(id)
+        if tarefa is not None:
+            return tarefa
+        diretorio = os.path.join(self.diretorio, os.path.basename(id))
+        if not os.path.exists(os.path.join(diretorio, ARQUIVO_ESTADO)):
+            return None
+        return Tarefa.carregar(diretorio)
+
+    def posicao_na_fila(self, tarefa):
+        if tarefa.situacao != NA_FILA:
+            return 0
+        return sum(outra.situacao == NA_FILA and outra.criada <= tarefa.criada for outra in list(self._tarefas.values()))
+
+    def remover(self, id):
+        tarefa = self.tarefa(id)
+        if tarefa is None or tarefa.ativa:
+            return
+        with self._trava:
+            self._tarefas.pop(tarefa.id, None)
+        shutil.rmtree(tarefa.diretorio, ignore_errors=True)
+
+    def _limpar(self):
+        # Remove do disco e da memória as tarefas terminadas há mais de IDADE_MAXIMA_TAREFAS.
+        if not os.path.isdir(self.diretorio):
+            return
+        limite = time.time() - IDADE_MAXIMA_TAREFAS
+        for id in os.listdir(self.diretorio):
+            tarefa = self._tarefas.get(id)
+            if tarefa is not None and tarefa.ativa:
+                continue
+            caminho = os.path.join(self.diretorio, id)
+            if os.path.getmtime(caminho) < limite:
+                self._tarefas.pop(id, None)
+                shutil.rmtree(caminho, ignore_errors=True)
+
+
+def _perfilar(tarefa, instrumentacao):
+    # O perfil pedido (instrumentacao.perfil) é gravado na pasta da tarefa, removida com ela.
+    if instrumentacao is None:
+        return nullcontext()
+    if instrumentacao.perfil:
+        instrumentacao.perfil = tarefa.caminho(ARQUIVO_PERFIL)
+    return instrumentacao.perfilar()
+
+
+def tarefa_gerar_corpus(tarefa, textos, entidades, siglas, cabecalhos=None, processos=1, cache=None, instrumentacao=None):
+    # Grava o corpus em corpus.txt e os primeiros registros em previa.txt; estatísticas e
+    # resumo do cache vão para o resultado da tarefa. O cache (da sessão) fica travado durante
+    # a geração, que o altera nesta thread. `textos` são registros {"id", "texto"} ou o nome de
+    # um arquivo na pasta da tarefa (ver submeter()), lido em fluxo.
+    if isinstance(textos, str):
+        textos = ler_textos(tarefa.caminho(textos))
+    estatisticas = EstatisticasCorpus()
+    registros = gerar_corpus(textos, entidades, siglas, cabecalhos, estatisticas, processos, cache=cache, instrumentacao=instrumentacao)
+
+    def acompanhados():
+        for registro in registros:
+            yield registro
+            tarefa.avancar()
+
+    with _perfilar(tarefa, instrumentacao), cache.trava if cache is not None else nullcontext():
+        with open(tarefa.caminho(ARQUIVO_CORPUS), "w", encoding="utf-8", newline="") as arquivo:
+            previa = escrever_corpus(acompanhados(), arquivo)
+        resumo_cache = cache.formatar() if cache is not None else None
+    with open(tarefa.caminho(ARQUIVO_PREVIA), "w", encoding="utf-8", newline="") as arquivo:
+        arquivo.write("".join(previa))
+    tarefa.extras["instrumentacao"] = instrumentacao
+    tarefa.resultado = {
+        "textos": estatisticas.total_textos,
+        "previa": len(previa),
+        "estatisticas": estatisticas.formatar(),
+        "cache": resumo_cache,
+    }
+
+
+def _ner_em_processo(conexao, texto, tamanho_lote, processos, memoria):
+    # Executado em um processo próprio, em cuja thread principal o spaCy pode criar os seus
+    # processos de NER. Envia pela conexão ("progresso", linhas), e ao final ("resultado",
+    # índice, medições) ou ("erro", mensagem); qualquer mensagem recebida é um pedido de cancelamento.
+    instrumentacao = Instrumentacao(memoria=memoria) if memoria is not None else None
+
+    def progresso(processados):
+        if conexao.poll():
+            raise TarefaCancelada()
+        conexao.send(("progresso", processados))
+
+    try:
+        indice = indexar_entidades(texto, tamanho_lote, processos, instrumentacao=instrumentacao, progresso=progresso)
+        conexao.send(("resultado", indice.como_dict(), instrumentacao.etapas if instrumentacao is not None else None))
+    except TarefaCancelada:
+        pass
+    except Exception as erro:
+        conexao.send(("erro", str(erro) or type(erro).__name__))
+    finally:
+        conexao.close()
+
+
+def _indexar_entidades_em_processo(tarefa, texto, tamanho_lote, processos, instrumentacao):
+    # O NER das tarefas roda em um processo filho, iniciado por forkserver (ou spawn) a partir
+    # desta thread: o nlp.pipe com vários processos é chamado da thread principal do filho, e as
+    # tarefas não compartilham o modelo do spaCy, que não garante o uso por várias threads.
+    contexto = _contexto_processos() or multiprocessing.get_context()
+    conexao, conexao_filho = contexto.Pipe()
+    memoria = instrumentacao.memoria if instrumentacao is not None else None
+    processo = contexto.Process(target=_ner_em_processo, args=(conexao_filho, texto, tamanho_lote, processos, memoria))
+    processo.start()
+    conexao_filho.close()
+    try:
+        while True:
+            if not conexao.poll(INTERVALO_GRAVACAO):
+                tarefa.avancar(tarefa.processados)
+                continue
+            try:
+                mensagem = conexao.recv()
+            except EOFError:
+                raise RuntimeError("o processo do NER terminou inesperadamente") from None
+            if mensagem[0] == "progresso":
+                tarefa.avancar(mensagem[1])
+            elif mensagem[0] == "erro":
+                raise RuntimeError(mensagem[1])
+            else:
+                _, indice, etapas = mensagem
+                if etapas is not None:
+                    instrumentacao.incorporar(etapas)
+                return IndiceTermos.de_dict(indice)
+    except TarefaCancelada:
+        with suppress(OSError):
+            conexao.send("cancelar")
+        raise
+    finally:
+        processo.join(INTERVALO_GRAVACAO)
+        if processo.is_alive():
+            processo.terminate()
+            processo.join()
+        conexao.close()
+
+
+def tarefa_analisar(tarefa, texto, tamanho_lote=TAMANHO_LOTE_NER, processos=1, instrumentacao=None):
+    # Grava o texto e os índices de siglas e de entidades em analise.json.
+    with _perfilar(tarefa, instrumentacao):
+        with medir_opcional(instrumentacao, "indice_siglas"):
+            indice_siglas = indexar_siglas(texto)
+        indice_entidades = _indexar_entidades_em_processo(tarefa, texto, tamanho_lote, processos, instrumentacao)
+    dados = {
+        "formato": FORMATO_ANALISE,
+        "texto": texto,
+        "siglas": indice_siglas.como_dict(),
+        "entidades": indice_entidades.como_dict(),
+    }
+    _gravar_atomico(tarefa.caminho(ARQUIVO_ANALISE), json.dumps(dados, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    tarefa.extras["instrumentacao"] = instrumentacao
+    tarefa.resultado = {"siglas": len(indice_siglas), "entidades": len(indice_entidades)}
+
+
+def carregar_analise(tarefa):
+    # Devolve (texto, índice de siglas, índice de entidades); ValueError se o arquivo não for válido.
+    caminho = tarefa.caminho(ARQUIVO_ANALISE)
+    try:
+        with open(caminho, "rb") as arquivo:
+            dados = json.load(arquivo)
+    except (UnicodeDecodeError, json.JSONDecodeError) as erro:
+        raise ValueError(f"{caminho}: análise inválida ({erro})") from None
+    if not isinstance(dados, dict) or dados.get("formato") != FORMATO_ANALISE or not isinstance(dados.get("texto"), str):
+        raise ValueError(f"{caminho}: formato de análise não suportado")
+    try:
+        return dados["texto"], IndiceTermos.de_dict(dados["siglas"]), IndiceTermos.de_dict(dados["entidades"])
+    except (KeyError, ValueError) as erro:
+        raise ValueError(f"{caminho}: {erro}") from None